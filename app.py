@@ -1,9 +1,11 @@
 """
-安德堂 八字排盘日期转换器 - Python Flask版本
+八字排盘日期转换器（安德堂 / 宏德堂）- Python Flask版本
 可以在线获取精确的节气数据
+一个进程同时服务多个品牌，按域名或路径前缀区分（见 tenants.py）
+转换逻辑在 core.py（不依赖 Flask），本文件只负责路由、页面与响应格式
 
 安装依赖：
-pip install flask requests lunarcalendar
+pip install flask requests numpy
 
 运行：
 python app.py
@@ -11,12 +13,59 @@ python app.py
 然后访问：http://localhost:5001
 """
 
-from flask import Flask, render_template_string, request, jsonify
-import requests
-from datetime import datetime, timedelta
-import json
+from flask import Flask, Response, g, redirect, render_template_string, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+import csv
+import os
+import time
+from functools import lru_cache
 
-app = Flask(__name__)
+from solar_terms import Term, term_table
+import metrics
+import profiling
+import serializers
+from assets import ASSETS_CACHE_CONTROL, AssetBundle
+from core import (TERM_PAIRS, canonical_convert_query, convert_one, convert_records, dump_json,
+                  fetch_online_solar_terms, online_terms_cache, parse_convert_query, result_cache,
+                  serialized_term_detail, warmup)
+from precompressed import PrecompressedAsset
+from request_log import REQUEST_LOG_PATH, RequestLog, Trace
+from tenants import TENANTS, tenant_for_host
+from upstream import Deadline
+
+class TermJSONProvider(DefaultJSONProvider):
+    """序列化时才把 Term 展开为节气详情字典；安装了 orjson 时用它读写 JSON"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Term):
+            return serialized_term_detail(o.index, o.minutes)
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        # 调试模式的缩进输出仍走标准库
+        if serializers.orjson is not None and 'indent' not in kwargs:
+            return serializers.dumps_json(obj, self.default)
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if serializers.orjson is not None and not kwargs:
+            return serializers.loads_json(s)
+        return super().loads(s, **kwargs)
+
+# 静态资源由 /assets/ 路由按带哈希的文件名提供
+app = Flask(__name__, static_folder=None)
+app.json = TermJSONProvider(app)
+
+# 批量转换单次最多记录数
+BATCH_MAX_RECORDS = int(os.environ.get('BATCH_MAX_RECORDS', '10000'))
+# 流式转换每批处理的记录数
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', '500'))
+# 节气表的 HTTP 缓存时间（秒）：本地计算结果只随版本变化，在线数据随上游刷新
+LOCAL_TERMS_MAX_AGE = int(os.environ.get('LOCAL_TERMS_MAX_AGE', str(7 * 24 * 3600)))
+ONLINE_TERMS_MAX_AGE = int(os.environ.get('ONLINE_TERMS_MAX_AGE', '3600'))
+# 每次转换的结构化日志（后台批量写入 JSONL，REQUEST_LOG_PATH 设为空则关闭）
+request_log = RequestLog(REQUEST_LOG_PATH) if REQUEST_LOG_PATH else None
 
 # HTML模板
 HTML_TEMPLATE = '''
@@ -25,34 +74,21 @@ HTML_TEMPLATE = '''
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>安德堂 八字排盘日期转换器</title>
-    <script src="https://cdn.tailwindcss.com"></script>
+    <title>{{ tenant.name }} 八字排盘日期转换器</title>
+    <link rel="stylesheet" href="{{ asset_url('css/app.css') }}">
+    {% if tenant.ui == 'picker' %}
     <!-- 引入 flatpickr 移动端日期选择器 -->
-    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/flatpickr/dist/flatpickr.min.css">
-    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/flatpickr/dist/themes/material_blue.css">
-    <script src="https://cdn.jsdelivr.net/npm/flatpickr"></script>
-    <script src="https://cdn.jsdelivr.net/npm/flatpickr/dist/l10n/zh.js"></script>
-    
-    <style>
-        /* 移动端优化样式 */
-        .flatpickr-calendar {
-            font-size: 16px !important;
-        }
-        .flatpickr-day {
-            height: 44px !important;
-            line-height: 44px !important;
-            max-width: 44px !important;
-        }
-        /* 防止 iOS 放大输入框 */
-        input[type="text"], input[type="number"], select {
-            font-size: 16px !important;
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('vendor/flatpickr/flatpickr.min.css') }}">
+    <link rel="stylesheet" href="{{ asset_url('vendor/flatpickr/themes/material_blue.css') }}">
+    <script src="{{ asset_url('vendor/flatpickr/flatpickr.min.js') }}" defer></script>
+    <script src="{{ asset_url('vendor/flatpickr/l10n/zh.js') }}" defer></script>
+    {% endif %}
+    <script src="{{ asset_url('js/app.js') }}" defer></script>
 </head>
-<body class="bg-gradient-to-br from-blue-50 via-indigo-50 to-purple-50 min-h-screen p-4">
+<body data-ui="{{ tenant.ui }}" class="bg-gradient-to-br from-blue-50 via-indigo-50 to-purple-50 min-h-screen p-4">
     <div class="max-w-4xl mx-auto">
         <div class="bg-white rounded-lg shadow-lg p-6 mb-6">
-            <h1 class="text-3xl font-bold text-center text-indigo-900 mb-2">安德堂 八字排盘日期转换器</h1>
+            <h1 class="text-3xl font-bold text-center text-indigo-900 mb-2">{{ tenant.name }} 八字排盘日期转换器</h1>
             <p class="text-center text-gray-600 text-sm mb-6">南半球出生者需转换为北半球对应日期时间进行排盘</p>
             
             <div class="space-y-4">
@@ -85,6 +121,7 @@ HTML_TEMPLATE = '''
                 </div>
                 
                 <div class="grid grid-cols-1 md:grid-cols-2 gap-4">
+                    {% if tenant.ui == 'picker' %}
                     <div>
                         <label class="text-gray-700 font-medium mb-2 block">出生日期</label>
                         <input type="text" id="inputDate" placeholder="选择日期"
@@ -97,6 +134,18 @@ HTML_TEMPLATE = '''
                                class="w-full px-4 py-3 border-2 border-gray-300 rounded-lg text-lg"
                                readonly>
                     </div>
+                    {% else %}
+                    <div>
+                        <label class="text-gray-700 font-medium mb-2 block">出生日期</label>
+                        <input type="date" id="inputDate" 
+                               class="w-full px-4 py-3 border-2 border-gray-300 rounded-lg text-lg">
+                    </div>
+                    <div>
+                        <label class="text-gray-700 font-medium mb-2 block">出生时间</label>
+                        <input type="time" id="inputTime" value="12:00"
+                               class="w-full px-4 py-3 border-2 border-gray-300 rounded-lg text-lg">
+                    </div>
+                    {% endif %}
                 </div>
                 
                 <button onclick="convertDate()" id="convertBtn" disabled
@@ -107,482 +156,416 @@ HTML_TEMPLATE = '''
         </div>
         
         <div id="resultArea"></div>
+        <div id="termTable"></div>
     </div>
-    
-    <script>
-        let solarTermsData = null;
-        let datePicker = null;
-        let timePicker = null;
-        
-        // 页面加载时初始化
-        window.addEventListener('DOMContentLoaded', function() {
-            const year = document.getElementById('year').value;
-            
-            // 初始化日期选择器（移动端友好的滚轮式）
-            datePicker = flatpickr("#inputDate", {
-                locale: "zh",
-                dateFormat: "Y-m-d",
-                defaultDate: `${year}-01-01`,
-                allowInput: false,
-                disableMobile: false,
-                minDate: `${year}-01-01`,
-                maxDate: `${year}-12-31`,
-                onChange: function(selectedDates, dateStr) {
-                    console.log("选择的日期:", dateStr);
-                }
-            });
-            
-            // 初始化时间选择器
-            timePicker = flatpickr("#inputTime", {
-                enableTime: true,
-                noCalendar: true,
-                dateFormat: "H:i",
-                time_24hr: true,
-                defaultDate: "12:00",
-                allowInput: false,
-                disableMobile: false,
-                minuteIncrement: 1
-            });
-        });
-        
-        // 更新年份范围的函数
-        function updateYearRange() {
-            const year = document.getElementById('year').value;
-            const minDate = `${year}-01-01`;
-            const maxDate = `${year}-12-31`;
-            
-            // 更新日期选择器的年份范围
-            if (datePicker) {
-                datePicker.set('minDate', minDate);
-                datePicker.set('maxDate', maxDate);
-                datePicker.setDate(`${year}-01-01`);
-            }
-            
-            console.log(`年份已更新为: ${year}`);
-        }
-        
-        async function fetchSolarTerms() {
-            const year = document.getElementById('year').value;
-            document.getElementById('loading').classList.remove('hidden');
-            document.getElementById('successMsg').classList.add('hidden');
-            
-            try {
-                const response = await fetch(`/api/solar_terms/${year}`);
-                const data = await response.json();
-                
-                if (data.success) {
-                    solarTermsData = data.terms;
-                    document.getElementById('loading').classList.add('hidden');
-                    document.getElementById('successMsg').classList.remove('hidden');
-                    document.getElementById('convertBtn').disabled = false;
-                    // 不再显示节气表格，只提示加载成功
-                } else {
-                    alert('查询失败：' + data.error);
-                    document.getElementById('loading').classList.add('hidden');
-                }
-            } catch (error) {
-                alert('查询失败：' + error.message);
-                document.getElementById('loading').classList.add('hidden');
-            }
-        }
-        
-        function renderTermTable(year, terms, source) {
-            const html = `
-                <div class="bg-white rounded-lg shadow-lg p-6">
-                    <h3 class="font-bold text-gray-800 mb-3">${year}年24节气精确时间表</h3>
-                    <p class="text-sm text-blue-600 mb-3">数据来源：${source}</p>
-                    <div class="overflow-x-auto">
-                        <table class="w-full text-sm">
-                            <thead>
-                                <tr class="bg-gray-100">
-                                    <th class="px-3 py-2 text-left">序号</th>
-                                    <th class="px-3 py-2 text-left">北半球节气</th>
-                                    <th class="px-3 py-2 text-left">日期时间</th>
-                                    <th class="px-3 py-2 text-left">南半球对应</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                ${terms.map((term, i) => `
-                                    <tr class="${i % 2 === 0 ? 'bg-white' : 'bg-gray-50'}">
-                                        <td class="px-3 py-2">${i + 1}</td>
-                                        <td class="px-3 py-2 font-medium text-blue-700">${term.name}</td>
-                                        <td class="px-3 py-2">${term.date} ${term.time}</td>
-                                        <td class="px-3 py-2 text-orange-700">${term.south_term}</td>
-                                    </tr>
-                                `).join('')}
-                            </tbody>
-                        </table>
-                    </div>
-                </div>
-            `;
-            document.getElementById('termTable').innerHTML = html;
-        }
-        
-        async function convertDate() {
-            const hemisphere = document.getElementById('hemisphere').value;
-            const year = document.getElementById('year').value;
-            const inputDate = document.getElementById('inputDate').value;
-            const inputTime = document.getElementById('inputTime').value;
-            
-            if (!inputDate || !inputTime) {
-                alert('请输入完整的日期和时间');
-                return;
-            }
-            
-            const response = await fetch('/api/convert', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({
-                    hemisphere, year, date: inputDate, time: inputTime
-                })
-            });
-            
-            const result = await response.json();
-            
-            if (result.success) {
-                // 隐藏输入表单，显示结果页面
-                document.querySelector('.bg-white.rounded-lg.shadow-lg.p-6.mb-6').style.display = 'none';
-                renderResult(result.data);
-            } else {
-                alert('转换失败：' + result.error);
-            }
-        }
-        
-        function renderResult(data) {
-            let html = `
-                <div class="bg-white rounded-lg shadow-lg p-6 mb-6">
-                    <h2 class="text-2xl font-bold text-center text-indigo-900 mb-6">转换结果</h2>
-                    <div class="grid grid-cols-1 md:grid-cols-2 gap-6 mb-4">
-                        <div class="bg-gradient-to-br from-orange-50 to-orange-100 rounded-lg p-5 border-2 border-orange-200">
-                            <div class="text-sm text-orange-700 font-medium mb-3">🌍 ${data.input_hemisphere}</div>
-                            <div class="text-2xl font-bold text-orange-900 mb-3">${data.input_datetime}</div>
-                            <div class="space-y-1 text-sm text-orange-800">
-                                <div>所处节气：<span class="font-bold">${data.current_term}</span></div>
-                                ${data.actual_term !== data.current_term ? `<div>实际节气：<span class="font-bold">${data.actual_term}</span></div>` : ''}
-                            </div>
-                        </div>
-                        <div class="bg-gradient-to-br from-blue-50 to-blue-100 rounded-lg p-5 border-2 border-blue-200">
-                            <div class="text-sm text-blue-700 font-medium mb-3">🌏 转换后（用于排盘）</div>
-                            <div class="text-2xl font-bold text-blue-900 mb-3">${data.output_datetime}</div>
-                        </div>
-                    </div>`;
-            
-            // 北半球节气信息
-            if (data.prev_term && data.current_term_detail && data.next_term) {
-                html += `
-                    <div class="bg-purple-50 rounded-lg p-4 border border-purple-200 mb-4">
-                        <h3 class="font-medium text-purple-900 mb-3 text-sm">北半球节气信息（原日期对应的节气区间）</h3>
-                        <div class="grid grid-cols-3 gap-3 text-sm">
-                            <div class="bg-white p-3 rounded">
-                                <div class="text-gray-600 text-xs mb-1">上一个节气</div>
-                                <div class="font-bold text-purple-800 mb-1">${data.prev_term.name}</div>
-                                <div class="text-gray-500 text-xs">${data.prev_term.display}</div>
-                            </div>
-                            <div class="bg-orange-100 p-3 rounded border-2 border-orange-300">
-                                <div class="text-orange-700 text-xs mb-1">当前所处节气</div>
-                                <div class="font-bold text-orange-900 mb-1">${data.current_term_detail.name}</div>
-                                <div class="text-orange-600 text-xs">${data.current_term_detail.display}</div>
-                            </div>
-                            <div class="bg-white p-3 rounded">
-                                <div class="text-gray-600 text-xs mb-1">下一个节气</div>
-                                <div class="font-bold text-purple-800 mb-1">${data.next_term.name}</div>
-                                <div class="text-gray-500 text-xs">${data.next_term.display}</div>
-                            </div>
-                        </div>
-                    </div>`;
-            }
-            
-            // 南半球节气信息
-            if (data.output_prev_term && data.output_current_term && data.output_next_term) {
-                const southTermPairs = {
-                    '立春': '立秋', '雨水': '处暑', '惊蛰': '白露', '春分': '秋分',
-                    '清明': '寒露', '谷雨': '霜降', '立夏': '立冬', '小满': '小雪',
-                    '芒种': '大雪', '夏至': '冬至', '小暑': '小寒', '大暑': '大寒',
-                    '立秋': '立春', '处暑': '雨水', '白露': '惊蛰', '秋分': '春分',
-                    '寒露': '清明', '霜降': '谷雨', '立冬': '立夏', '小雪': '小满',
-                    '大雪': '芒种', '冬至': '夏至', '小寒': '小暑', '大寒': '大暑'
-                };
-                
-                html += `
-                    <div class="bg-amber-50 rounded-lg p-4 border border-amber-200 mb-4">
-                        <h3 class="font-medium text-amber-900 mb-3 text-sm">南半球节气信息（实际对应的南半球节气）</h3>
-                        <div class="grid grid-cols-3 gap-3 text-sm">
-                            <div class="bg-white p-3 rounded">
-                                <div class="text-gray-600 text-xs mb-1">上一个节气</div>
-                                <div class="font-bold text-amber-800 mb-1">${southTermPairs[data.prev_term.name] || ''}</div>
-                                <div class="text-gray-500 text-xs">对应北半球<br/>${data.prev_term.name}</div>
-                            </div>
-                            <div class="bg-amber-100 p-3 rounded border-2 border-amber-300">
-                                <div class="text-amber-700 text-xs mb-1">当前实际节气</div>
-                                <div class="font-bold text-amber-900 mb-1">${data.actual_term}</div>
-                                <div class="text-amber-600 text-xs">对应北半球<br/>${data.current_term}</div>
-                            </div>
-                            <div class="bg-white p-3 rounded">
-                                <div class="text-gray-600 text-xs mb-1">下一个节气</div>
-                                <div class="font-bold text-amber-800 mb-1">${southTermPairs[data.next_term.name] || ''}</div>
-                                <div class="text-gray-500 text-xs">对应北半球<br/>${data.next_term.name}</div>
-                            </div>
-                        </div>
-                    </div>`;
-            }
-            
-            html += `
-                    <div class="bg-indigo-50 rounded-lg p-4 mb-4">
-                        <p class="text-center text-indigo-900 font-medium text-sm">
-                            ${data.input_hemisphere.includes('南') ? `${data.input_datetime} → ${data.output_datetime}` : `确认使用 ${data.input_datetime}`}
-                        </p>
-                    </div>
-                    <div class="bg-green-50 rounded-lg p-4 border border-green-200 mb-4">
-                        <p class="text-sm text-green-800">
-                            <strong>✓ 八字排盘使用：</strong>
-                            <span class="font-bold text-green-900 text-lg ml-2">${data.output_date} ${data.output_time}</span>
-                        </p>
-                    </div>
-                    <div class="text-center">
-                        <button onclick="resetForm()" class="px-8 py-3 bg-indigo-600 hover:bg-indigo-700 text-white font-bold rounded-lg">
-                            重新查询
-                        </button>
-                    </div>
-                </div>
-            `;
-            document.getElementById('resultArea').innerHTML = html;
-        }
-        
-        function resetForm() {
-            // 显示输入表单
-            document.querySelector('.bg-white.rounded-lg.shadow-lg.p-6.mb-6').style.display = 'block';
-            // 清空结果区域
-            document.getElementById('resultArea').innerHTML = '';
-            // 重置表单状态
-            document.getElementById('convertBtn').disabled = true;
-            document.getElementById('successMsg').classList.add('hidden');
-        }
-    </script>
 </body>
 </html>
 '''
 
-# 节气对应关系
-TERM_PAIRS = {
-    '立春': '立秋', '雨水': '处暑', '惊蛰': '白露', '春分': '秋分',
-    '清明': '寒露', '谷雨': '霜降', '立夏': '立冬', '小满': '小雪',
-    '芒种': '大雪', '夏至': '冬至', '小暑': '小寒', '大暑': '大寒',
-    '立秋': '立春', '处暑': '雨水', '白露': '惊蛰', '秋分': '春分',
-    '寒露': '清明', '霜降': '谷雨', '立冬': '立夏', '小雪': '小满',
-    '大雪': '芒种', '冬至': '夏至', '小寒': '小暑', '大寒': '大暑'
-}
-
-TERM_NAMES = ['立春', '雨水', '惊蛰', '春分', '清明', '谷雨',
-              '立夏', '小满', '芒种', '夏至', '小暑', '大暑',
-              '立秋', '处暑', '白露', '秋分', '寒露', '霜降',
-              '立冬', '小雪', '大雪', '冬至', '小寒', '大寒']
+# 自托管的 CSS/JS，文件名带内容哈希
+ASSETS = AssetBundle()
+
+# 页面只依赖静态资源地址与品牌：启动时为每个品牌渲染一次并预压缩
+with app.app_context():
+    INDEX_PAGES = {key: PrecompressedAsset(render_template_string(HTML_TEMPLATE, asset_url=ASSETS.url, tenant=tenant),
+                                           'text/html')
+                   for key, tenant in TENANTS.items()}
+INDEX_CACHE_CONTROL = 'public, max-age=300'
+
+# 录制请求形态供 loadtest.py 回放（设置 TRAFFIC_RECORD=文件路径 开启）
+TRAFFIC_RECORD = os.environ.get('TRAFFIC_RECORD')
+if TRAFFIC_RECORD:
+    from loadtest import TrafficRecorder
+    traffic_recorder = TrafficRecorder(TRAFFIC_RECORD)
+
+    @app.before_request
+    def record_traffic():
+        # 流式转换边读边处理，请求体不能提前读出
+        streaming = request.endpoint == 'convert_stream'
+        body = None if streaming or not request.content_length else request.get_data(cache=True, as_text=True)
+        traffic_recorder.record(request.method, request.full_path.rstrip('?'), request.content_type, body)
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+# 按需性能分析与慢请求捕获（见 profiling.py，未配置时不注册钩子）
+if profiling.enabled():
+    profile_store = profiling.ProfileStore()
+    slow_sampler = profiling.SlowRequestSampler() if profiling.PROFILE_SLOW_MS > 0 else None
+
+    @app.before_request
+    def start_profiling():
+        if request.endpoint in (None, 'static_asset', 'metrics_endpoint'):
+            return
+        if profiling.should_profile(request.headers.get(profiling.PROFILE_HEADER)):
+            g.profile_path = profile_store.path(request.endpoint, '.pstats')
+            g.profile = profiling.start_profile()
+        elif slow_sampler is not None:
+            g.slow_samples = slow_sampler.begin()
+
+    @app.after_request
+    def add_profile_header(response):
+        if 'profile_path' in g:
+            response.headers['X-Profile-Id'] = os.path.basename(g.profile_path)
+        return response
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        # 流式响应在输出结束后才执行，分析覆盖整个流
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.disable()
+            profile_store.save_pstats(profile, g.profile_path)
+            app.logger.info("已保存性能分析：%s", g.profile_path)
+        elif g.pop('slow_samples', None) is not None:
+            samples = slow_sampler.end(g.started)
+            if samples:
+                elapsed_ms = (time.perf_counter() - g.started) * 1000
+                path = profile_store.path(f"{request.endpoint}-{elapsed_ms:.0f}ms", '.collapsed')
+                profile_store.save_collapsed(samples, path)
+                app.logger.warning("慢请求 %s 耗时 %.0f ms，调用栈采样已保存：%s",
+                                   request.full_path.rstrip('?'), elapsed_ms, path)
+
+@app.after_request
+def observe_request(response):
+    """按接口记录请求耗时（流式响应只计到开始输出为止）"""
+    started = g.get('started')
+    if started is not None and request.url_rule is not None and request.endpoint != 'metrics_endpoint':
+        metrics.REQUEST_SECONDS.labels(request.url_rule.rule, request.method, str(response.status_code)).observe(
+            time.perf_counter() - started)
+    return response
+
+def log_error(endpoint):
+    """记录处理出错的请求（日志带堆栈，并计入错误计数）"""
+    app.logger.exception("%s 处理失败", endpoint)
+    metrics.ERRORS.labels(endpoint).inc()
+
+def conversion_trace(endpoint):
+    """一次转换的请求日志记录（with 块结束时入队）"""
+    return Trace(request_log, endpoint)
+
+def conversion_input(data):
+    """请求日志中的输入：只保留转换用到的字段"""
+    if not isinstance(data, dict):
+        return data
+    return {key: data.get(key) for key in ('hemisphere', 'date', 'time')}
+
+def conversion_output(result):
+    """请求日志中的输出摘要"""
+    return {key: result[key] for key in ('output_datetime', 'current_term', 'actual_term')}
+
+def batch_output(results):
+    """请求日志中批量转换的输出摘要（条数与失败条数）"""
+    return {'records': len(results), 'failed': sum(1 for result in results if not result['success'])}
+
+def request_data():
+    """请求体：JSON，或 MessagePack（Content-Type: application/msgpack）"""
+    if request.mimetype in serializers.MSGPACK_MIMETYPES:
+        return serializers.unpack(request.get_data())
+    return request.json
+
+def api_response(obj):
+    """按 Accept 返回 JSON 或 MessagePack"""
+    if serializers.accepts_msgpack(request.accept_mimetypes):
+        response = Response(serializers.pack(obj, app.json.default), mimetype=serializers.MSGPACK_MIMETYPE)
+    else:
+        response = jsonify(obj)
+    response.vary.add('Accept')
+    return response
+
+def request_fields(data=None):
+    """fields 参数：请求体中的 fields 优先，其次为查询参数"""
+    value = data.get('fields') if isinstance(data, dict) else None
+    return serializers.parse_fields(value if value is not None else request.args.get('fields'))
+
+def project(data, fields):
+    """只保留 fields 中的字段；prev_term.name 形式取嵌套字段（不修改 data）"""
+    if not fields:
+        return data
+    result = {key: data[key] for key in fields if key in data}
+    for field in fields:
+        key, _, rest = field.partition('.')
+        # 已包含整个字段时忽略其嵌套字段
+        if not rest or key not in data or key in fields:
+            continue
+        value = data[key]
+        if isinstance(value, Term):
+            value = value.to_detail()
+        if isinstance(value, dict):
+            nested = project(value, (rest,))
+            if nested:
+                result.setdefault(key, {}).update(nested)
+    return result
+
+def project_results(results, fields):
+    """批量结果逐条投影"""
+    if not fields:
+        return results
+    return [{**result, 'data': project(result['data'], fields)} if result['success'] else result
+            for result in results]
 
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    """按 Host 选择品牌的首页"""
+    return INDEX_PAGES[tenant_for_host(request.host).key].response(request, INDEX_CACHE_CONTROL)
+
+@app.route('/<tenant_key>/')
+def tenant_index(tenant_key):
+    """按路径前缀选择品牌的首页，如 /hongde/"""
+    page = INDEX_PAGES.get(tenant_key)
+    if page is None:
+        return Response(status=404)
+    return page.response(request, INDEX_CACHE_CONTROL)
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    """带哈希的静态资源，内容不变则 URL 不变，可长期缓存"""
+    asset = ASSETS.get(filename)
+    if asset is None:
+        return Response(status=404)
+    return asset.response(request, ASSETS_CACHE_CONTROL)
 
 @app.route('/api/solar_terms/<int:year>')
 def get_solar_terms(year):
-    """获取指定年份的节气数据"""
+    """获取指定年份的节气数据（带 ETag，条件请求返回 304）"""
     try:
-        # 尝试从在线API获取
-        terms = fetch_online_solar_terms(year)
-        source = "在线API（实时数据）"
-        
-        if not terms:
-            # 降级到本地计算
-            terms = calculate_local_solar_terms(year)
-            source = "本地天文算法"
-        
-        # 添加南半球对应节气
-        for term in terms:
-            term['south_term'] = TERM_PAIRS.get(term['name'], '')
-        
-        return jsonify({'success': True, 'terms': terms, 'source': source})
+        body, max_age = solar_terms_body(year, Deadline())
+        return json_asset(body).response(request, f'public, max-age={max_age}')
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        log_error('/api/solar_terms')
+        response = jsonify({'success': False, 'error': str(e)})
+        response.headers['Cache-Control'] = 'no-store'
+        return response
 
 @app.route('/api/convert', methods=['POST'])
 def convert_date():
     """转换南北半球日期"""
+    with conversion_trace('/api/convert') as trace:
+        try:
+            data = request_data()
+            trace.input = conversion_input(data)
+            result = convert_one(data['hemisphere'], data['date'], data['time'], Deadline())
+            trace.output = conversion_output(result)
+            with metrics.stage('serialize'):
+                return api_response({'success': True, 'data': project(result, request_fields(data))})
+        except Exception as e:
+            log_error('/api/convert')
+            trace.error = str(e)
+            return api_response({'success': False, 'error': str(e)})
+
+@app.route('/api/convert', methods=['GET'])
+def convert_date_get():
+    """可缓存的转换接口：/api/convert?h=south&dt=2024-03-05T12:00[&fields=current_term,output_datetime]
+
+    参数不是规范形式时（别名、大小写、秒、参数顺序、字段顺序等）301 跳转到规范 URL，
+    使相同的查询只对应一个缓存键。
+    """
     try:
-        data = request.json
-        hemisphere = data['hemisphere']
-        year = int(data['year'])
-        input_date = data['date']
-        input_time = data['time']
-        
-        # 获取节气数据
-        terms = fetch_online_solar_terms(year) or calculate_local_solar_terms(year)
-        
-        # 解析输入日期时间
-        dt = datetime.strptime(f"{input_date} {input_time}", "%Y-%m-%d %H:%M")
-        
-        # 找到所处的节气区间
-        current_term_info = find_term_range(dt, terms, year)
-        
-        if hemisphere == 'north':
-            # 北半球不转换
-            result = {
-                'input_hemisphere': '北半球（原始）',
-                'input_datetime': f"{input_date} {input_time}",
-                'current_term': current_term_info['current']['name'],
-                'actual_term': current_term_info['current']['name'],
-                'output_datetime': f"{input_date} {input_time}",
-                'output_date': input_date,
-                'output_time': input_time,
-                'prev_term': current_term_info['prev'],
-                'current_term_detail': current_term_info['current'],
-                'next_term': current_term_info['next']
-            }
-        else:
-            # 南半球转换
-            south_term_name = TERM_PAIRS[current_term_info['current']['name']]
-            
-            # 计算需要查询的年份
-            term_month_map = {
-                '立春': 2, '雨水': 2, '惊蛰': 3, '春分': 3, '清明': 4, '谷雨': 4,
-                '立夏': 5, '小满': 5, '芒种': 6, '夏至': 6, '小暑': 7, '大暑': 7,
-                '立秋': 8, '处暑': 8, '白露': 9, '秋分': 9, '寒露': 10, '霜降': 10,
-                '立冬': 11, '小雪': 11, '大雪': 12, '冬至': 12, '小寒': 1, '大寒': 1
-            }
-            
-            south_month = term_month_map[south_term_name]
-            target_year = year - 1 if south_month > dt.month else year
-            
-            # 获取目标年份的节气
-            target_terms = fetch_online_solar_terms(target_year) or calculate_local_solar_terms(target_year)
-            
-            # 找到对应的南半球节气
-            south_term = next((t for t in target_terms if t['name'] == south_term_name), None)
-            
-            if south_term:
-                # 计算时间差
-                south_term_dt = datetime.strptime(f"{south_term['date']} {south_term['time']}", "%Y-%m-%d %H:%M")
-                time_diff = dt - current_term_info['current']['datetime']
-                output_dt = south_term_dt + time_diff
-                
-                # 找到转换后的节气区间
-                output_term_info = find_term_range(output_dt, target_terms, target_year)
-                
-                result = {
-                    'input_hemisphere': '南半球（原始）',
-                    'input_datetime': f"{input_date} {input_time}",
-                    'current_term': current_term_info['current']['name'],
-                    'actual_term': south_term_name,
-                    'output_datetime': output_dt.strftime("%Y-%m-%d %H:%M"),
-                    'output_date': output_dt.strftime("%Y-%m-%d"),
-                    'output_time': output_dt.strftime("%H:%M"),
-                    'prev_term': current_term_info['prev'],
-                    'current_term_detail': current_term_info['current'],
-                    'next_term': current_term_info['next'],
-                    'output_prev_term': output_term_info['prev'],
-                    'output_current_term': output_term_info['current'],
-                    'output_next_term': output_term_info['next'],
-                    'south_term_detail': south_term
-                }
-            else:
-                return jsonify({'success': False, 'error': '无法找到对应的南半球节气'})
-        
-        return jsonify({'success': True, 'data': result})
+        hemisphere, dt = parse_convert_query(request.args)
+        fields = request_fields()
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({'success': False, 'error': str(e)})
-
-def find_term_range(dt, terms, year):
-    """找到日期时间所处的节气区间"""
-    # 转换所有节气为datetime对象
-    term_list = []
-    for term in terms:
-        term_year = year if term['month'] >= 2 else year + 1
-        term_dt = datetime.strptime(f"{term_year}-{str(term['month']).zfill(2)}-{str(term['day']).zfill(2)} {term['time']}", "%Y-%m-%d %H:%M")
-        term_list.append({
-            'name': term['name'],
-            'datetime': term_dt,
-            'date': term['date'],
-            'time': term['time'],
-            'display': f"{term_year}年{term['month']}月{term['day']}日 {term['time']}"
-        })
-    
-    # 排序
-    term_list.sort(key=lambda x: x['datetime'])
-    
-    # 找到所处区间
-    for i in range(len(term_list)):
-        if i == len(term_list) - 1:
-            if dt >= term_list[i]['datetime']:
-                return {
-                    'prev': term_list[i-1] if i > 0 else term_list[-1],
-                    'current': term_list[i],
-                    'next': term_list[0]
-                }
-        else:
-            if dt >= term_list[i]['datetime'] and dt < term_list[i+1]['datetime']:
-                prev_term = term_list[i-1] if i > 0 else term_list[-1]
-                return {
-                    'prev': prev_term,
-                    'current': term_list[i],
-                    'next': term_list[i+1]
-                }
+        log_error('/api/convert')
+        with conversion_trace('/api/convert') as trace:
+            trace.input = request.args.to_dict()
+            trace.error = str(e)
+        response = jsonify({'success': False, 'error': str(e)})
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    canonical = canonical_convert_query(hemisphere, dt, fields)
+    if request.query_string.decode('latin-1') != canonical:
+        response = redirect(f"{request.path}?{canonical}", 301)
+        response.headers['Cache-Control'] = f'public, max-age={LOCAL_TERMS_MAX_AGE}'
+        return response
     
-    # 默认返回第一个
-    return {
-        'prev': term_list[-1],
-        'current': term_list[0],
-        'next': term_list[1]
-    }
-
-def fetch_online_solar_terms(year):
-    """从在线API获取节气数据"""
+    with conversion_trace('/api/convert') as trace:
+        trace.input = {'hemisphere': hemisphere, 'date': f"{dt:%Y-%m-%d}", 'time': f"{dt:%H:%M}"}
+        try:
+            result = convert_one(hemisphere, trace.input['date'], trace.input['time'], Deadline())
+            trace.output = conversion_output(result)
+            with metrics.stage('serialize'):
+                asset = json_asset(dump_json({'success': True, 'data': project(result, fields)}))
+            # 结果可能包含在线节气数据，按较短的在线数据缓存时间
+            return asset.response(request, f'public, max-age={ONLINE_TERMS_MAX_AGE}')
+        except Exception as e:
+            log_error('/api/convert')
+            trace.error = str(e)
+            response = jsonify({'success': False, 'error': str(e)})
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+
+@app.route('/api/convert_batch', methods=['POST'])
+def convert_batch():
+    """批量转换：请求体为 {"records": [{hemisphere, date, time}, ...], "fields": [...]}，
+    逐条返回与 /api/convert 相同的字段（请求体与响应均可为 MessagePack）
+    """
+    with conversion_trace('/api/convert_batch') as trace:
+        try:
+            data = request_data()
+            records = data['records'] if isinstance(data, dict) else data
+            trace.input = {'records': len(records)}
+            if len(records) > BATCH_MAX_RECORDS:
+                trace.error = f'单次最多转换 {BATCH_MAX_RECORDS} 条记录'
+                return api_response({'success': False, 'error': trace.error})
+            results = convert_records(records, Deadline())
+            trace.output = batch_output(results)
+            fields = request_fields(data)
+            with metrics.stage('serialize'):
+                return api_response({'success': True, 'results': project_results(results, fields)})
+        except Exception as e:
+            log_error('/api/convert_batch')
+            trace.error = str(e)
+            return api_response({'success': False, 'error': str(e)})
+
+@app.route('/api/convert_stream', methods=['POST'])
+def convert_stream():
+    """流式转换：请求体为 NDJSON（每行一条记录）或带表头的 CSV（Content-Type: text/csv）
+
+    边读边按 STREAM_CHUNK_SIZE 条一批转换，结果以 NDJSON 逐行返回，
+    每行带输入行号 line；单行出错只在该行返回 error，不中断整个流。
+    查询参数 fields 指定只返回的字段。
+    """
+    if request.mimetype == 'text/csv':
+        records = _csv_records(request.stream)
+    else:
+        records = _ndjson_records(request.stream)
+    return Response(stream_with_context(_stream_results(records, request.mimetype, request_fields())),
+                    mimetype='application/x-ndjson')
+
+def _decode_line(line):
+    """按 UTF-8 解码一行请求体，返回 (文本, 错误信息)"""
     try:
-        # 这里可以对接真实的节气API
-        # 示例：使用免费的农历API
-        url = f"https://api.xygeng.cn/lunar/solar/{year}/1/1"
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code == 200:
-            # 解析API返回的数据
-            # 这里需要根据实际API格式处理
-            pass
-        
-        return None  # API失败返回None
-    except:
-        return None
-
-def calculate_local_solar_terms(year):
-    """本地计算节气（备用方案）"""
-    # 使用简化的天文算法
-    terms = []
-    base_dates = [
-        (2, 4, 19, 0), (2, 19, 14, 50), (3, 5, 12, 59), (3, 20, 13, 48),
-        (4, 4, 17, 46), (4, 20, 0, 51), (5, 5, 11, 3), (5, 21, 0, 1),
-        (6, 5, 15, 12), (6, 21, 7, 59), (7, 7, 1, 27), (7, 22, 18, 55),
-        (8, 7, 11, 16), (8, 23, 2, 2), (9, 7, 14, 14), (9, 22, 23, 44),
-        (10, 8, 5, 57), (10, 23, 9, 9), (11, 7, 9, 11), (11, 22, 6, 44),
-        (12, 7, 2, 2), (12, 21, 20, 4), (1, 5, 13, 14), (1, 20, 6, 40)
-    ]
+        return line.decode('utf-8-sig'), None
+    except UnicodeDecodeError as e:
+        return None, f"UTF-8 解码失败：{e}"
+
+def _ndjson_records(lines):
+    """逐行解析 NDJSON，产出 (行号, 记录, 错误信息)"""
+    for line_no, line in enumerate(lines, 1):
+        line, error = _decode_line(line)
+        if error is not None:
+            yield line_no, None, error
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, app.json.loads(line), None
+        except ValueError as e:
+            yield line_no, None, f"JSON 解析失败：{e}"
+
+def _csv_records(lines):
+    """逐行解析带表头（hemisphere,date,time）的 CSV，产出 (行号, 记录, 错误信息)
+
+    无法解码的行单独输出一条错误，并以空行交给 csv 解析，后续行号不变。
+    """
+    errors = []
+
+    def decoded():
+        for line_no, line in enumerate(lines, 1):
+            text, error = _decode_line(line)
+            if error is not None:
+                errors.append((line_no, None, error))
+                text = '\n'
+            yield text
+
+    reader = csv.DictReader(decoded())
+    for row in reader:
+        yield from errors
+        errors.clear()
+        yield reader.line_num, row, None
+    yield from errors
+
+def _stream_results(records, mimetype, fields=None):
+    # 整个流记为一条请求日志（输出为总条数与失败条数）
+    with conversion_trace('/api/convert_stream') as trace:
+        trace.input = {'content_type': mimetype}
+        trace.output = {'records': 0, 'failed': 0}
+        chunk = []
+        for item in records:
+            chunk.append(item)
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield _convert_chunk(chunk, trace=trace, fields=fields)
+                chunk = []
+        if chunk:
+            yield _convert_chunk(chunk, trace=trace, fields=fields)
+
+def _convert_chunk(chunk, deadline=None, trace=None, fields=None):
+    """转换一批记录，返回这一批的 NDJSON 文本"""
+    valid = [record for _, record, error in chunk if error is None]
+    converted = iter(project_results(convert_records(valid, deadline or Deadline()), fields))
+    lines = []
+    failed = 0
+    with metrics.stage('serialize'):
+        for line_no, _, error in chunk:
+            result = {'success': False, 'error': error} if error is not None else next(converted)
+            failed += not result['success']
+            result['line'] = line_no
+            lines.append(dump_json(result))
+    if trace is not None:
+        trace.output['records'] += len(chunk)
+        trace.output['failed'] += failed
+    return '\n'.join(lines) + '\n'
+
+@app.route('/readyz')
+def readyz():
+    """就绪检查：节气数据预热完成前返回 503"""
+    ready = warmup.ready.is_set()
+    return jsonify({'ready': ready}), 200 if ready else 503
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus 指标（多 worker 时合并所有 worker）"""
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+@app.route('/api/cache_stats')
+def cache_stats():
+    """节气缓存与转换结果缓存的命中统计（当前 worker）"""
+    return jsonify({'success': True, 'online_terms': online_terms_cache.stats(),
+                    'results': result_cache.stats()})
+
+def solar_terms_body(year, deadline=None, online=None):
+    """指定年份节气表的响应体及其缓存时间 (body, max_age)
+
+    online 为调用方已取得的在线数据 {年份: 数据}（与 core.load_timeline 的 terms 相同）。
+    """
+    # 尝试从在线API获取
+    terms = online.get(year) if online is not None else fetch_online_solar_terms(year, deadline)
+    metrics.count_source('online' if terms else 'local')
+    source = "在线API（实时数据）"
+    max_age = ONLINE_TERMS_MAX_AGE
+    
+    if not terms:
+        # 降级到本地计算
+        with metrics.stage('terms'):
+            terms = term_table(year).to_list()
+        source = "本地天文算法"
+        max_age = LOCAL_TERMS_MAX_AGE
     
-    for i, (m, d, h, min_val) in enumerate(base_dates):
-        display_year = year if m >= 2 else year + 1
-        terms.append({
-            'name': TERM_NAMES[i],
-            'date': f"{display_year}-{str(m).zfill(2)}-{str(d).zfill(2)}",
-            'time': f"{str(h).zfill(2)}:{str(min_val).zfill(2)}",
-            'month': m,
-            'day': d,
-            'hour': h,
-            'minute': min_val
-        })
+    # 添加南半球对应节气
+    for term in terms:
+        term['south_term'] = TERM_PAIRS.get(term['name'], '')
     
-    return terms
+    with metrics.stage('serialize'):
+        return dump_json({'success': True, 'terms': terms, 'source': source}), max_age
+
+@lru_cache(maxsize=512)
+def json_asset(body):
+    """JSON 响应体的预压缩版本（键排序、紧凑格式，相同内容得到相同 ETag）
+
+    在请求中生成，brotli 使用 5 级：压缩率接近 11 级，耗时约为其 1/50。
+    """
+    return PrecompressedAsset(body + '\n', 'application/json', brotli_quality=5)
 
 if __name__ == '__main__':
     print("=" * 50)
-    print("安德堂 八字排盘日期转换器")
+    print(f"{tenant_for_host(None).name} 八字排盘日期转换器")
     print("=" * 50)
     print("服务启动中...")
     print("访问地址：http://localhost:5001")
+    print(f"各品牌页面：{'、'.join(f'http://localhost:5001/{key}/' for key in TENANTS)}")
     print("按 Ctrl+C 停止服务")
     print("=" * 50)
+    warmup.start()
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
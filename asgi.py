@@ -0,0 +1,418 @@
+"""
+ASGI 版本（Starlette），路由、页面与响应体与 app.py 相同
+
+同步 worker 中每个等待在线数据源的请求都会占住整个 worker；这里上游请求改为
+aiohttp 异步发送，成千上万个请求可以在一个进程里同时等待 I/O。
+处理流程：先异步预取所需年份的在线节气数据（写入共享缓存），再调用 core.py 中的
+同步转换逻辑——后者是纯计算，不会再访问上游。单条转换把预取到的数据直接传入，
+在事件循环中完成（微秒级），不再同步读取缓存（SQLite 读写会阻塞事件循环）；
+批量与流式转换放到线程池，以"只读缓存"的方式执行。
+
+运行：
+uvicorn asgi:app --port 8000 --workers 2
+gunicorn asgi:app -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000 --workers 2
+"""
+
+import asyncio
+import contextlib
+import csv
+import logging
+import time
+from collections import deque
+from datetime import datetime
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import RedirectResponse, Response, StreamingResponse
+from starlette.middleware import Middleware
+from starlette.routing import Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags
+
+import app as wsgi
+import core
+import metrics
+import serializers
+from assets import ASSETS_CACHE_CONTROL
+from upstream import AsyncUpstreamClient, Deadline, UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+# 与同步客户端共用熔断状态（后台刷新线程使用同步客户端）
+upstream = AsyncUpstreamClient(breaker=core.upstream.breaker)
+
+
+def cache_only():
+    """已耗尽的预算：只读取在线数据缓存，不访问上游（只在线程池中使用）"""
+    return Deadline(0)
+
+
+def json_response(obj, headers=None):
+    """与 Flask jsonify 字节一致的 JSON 响应"""
+    return Response(core.dump_json(obj) + '\n', media_type='application/json', headers=headers)
+
+
+def error_response(e, cacheable=True):
+    return json_response({'success': False, 'error': str(e)},
+                         None if cacheable else {'Cache-Control': 'no-store'})
+
+
+def api_response(request, obj):
+    """按 Accept 返回 JSON 或 MessagePack（与 app.api_response 相同）"""
+    if serializers.accepts_msgpack(parse_accept_header(request.headers.get('accept'), MIMEAccept)):
+        return Response(serializers.pack(obj, wsgi.app.json.default), media_type=serializers.MSGPACK_MIMETYPE,
+                        headers={'Vary': 'Accept'})
+    return json_response(obj, {'Vary': 'Accept'})
+
+
+async def request_data(request):
+    """请求体：JSON，或 MessagePack（Content-Type: application/msgpack）"""
+    body = await request.body()
+    if request.headers.get('content-type', '').split(';')[0].strip() in serializers.MSGPACK_MIMETYPES:
+        return serializers.unpack(body)
+    return wsgi.app.json.loads(body)
+
+
+def request_fields(request, data=None):
+    value = data.get('fields') if isinstance(data, dict) else None
+    return serializers.parse_fields(value if value is not None else request.query_params.get('fields'))
+
+
+def log_error(endpoint):
+    logger.exception("%s 处理失败", endpoint)
+    metrics.ERRORS.labels(endpoint).inc()
+
+
+def asset_response(asset, request, cache_control):
+    """PrecompressedAsset 的 Starlette 响应；If-None-Match 命中时返回 304"""
+    encoding, etag, not_modified = asset.negotiate(
+        parse_accept_header(request.headers.get('accept-encoding')),
+        parse_etags(request.headers.get('if-none-match')))
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(asset.variants[encoding], media_type=asset.mimetype, headers=headers)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """边读请求体边输出结果的流式响应
+
+    StreamingResponse 在 ASGI 2.3 以下会另起任务监听断开，抢走尚未读取的请求体；
+    这里只输出，断开由读取请求体时的 ClientDisconnect 处理。
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+async def fetch_online_solar_terms(year, deadline=None):
+    """异步获取在线节气数据（与同步版本共用缓存）"""
+    if not core.ONLINE_TERMS_URL:
+        return None
+    try:
+        return await core.online_terms_cache.aget_or_load(
+            year, lambda y: _request_online_solar_terms(y, deadline),
+            timeout=deadline.remaining() if deadline else None)
+    except UpstreamUnavailable:
+        return None
+
+
+async def _request_online_solar_terms(year, deadline=None):
+    started = time.perf_counter()
+    try:
+        response = await upstream.get(core.ONLINE_TERMS_URL.format(year=year), deadline)
+    except UpstreamUnavailable:
+        metrics.count_upstream('skipped')
+        raise
+    except upstream.errors as e:
+        metrics.observe_stage('upstream', time.perf_counter() - started)
+        metrics.count_upstream('timeout' if isinstance(e, asyncio.TimeoutError) else 'error')
+        logger.warning("在线节气数据获取失败（%s年）：%s", year, e)
+        return None
+    metrics.observe_stage('upstream', time.perf_counter() - started)
+    metrics.count_upstream('success')
+    return core.parse_online_solar_terms(year, response)
+
+
+async def prefetch(years, deadline):
+    """并发预取多个年份的在线节气数据，返回 {年份: 数据}（无在线数据的年份为 None）"""
+    years = list(years)
+    return dict(zip(years, await asyncio.gather(*(fetch_online_solar_terms(year, deadline) for year in years))))
+
+
+async def index(request):
+    page = wsgi.INDEX_PAGES[wsgi.tenant_for_host(request.headers.get('host')).key]
+    return asset_response(page, request, wsgi.INDEX_CACHE_CONTROL)
+
+
+async def tenant_index(request):
+    page = wsgi.INDEX_PAGES.get(request.path_params['tenant_key'])
+    if page is None:
+        return Response(status_code=404)
+    return asset_response(page, request, wsgi.INDEX_CACHE_CONTROL)
+
+
+async def static_asset(request):
+    asset = wsgi.ASSETS.get(request.path_params['filename'])
+    if asset is None:
+        return Response(status_code=404)
+    return asset_response(asset, request, ASSETS_CACHE_CONTROL)
+
+
+async def get_solar_terms(request):
+    year = request.path_params['year']
+    try:
+        terms = await prefetch((year,), Deadline())
+        body, max_age = wsgi.solar_terms_body(year, online=terms)
+        return asset_response(wsgi.json_asset(body), request, f'public, max-age={max_age}')
+    except Exception as e:
+        log_error('/api/solar_terms')
+        return error_response(e, cacheable=False)
+
+
+async def convert_date(request):
+    with wsgi.conversion_trace('/api/convert') as trace:
+        try:
+            data = await request_data(request)
+            trace.input = wsgi.conversion_input(data)
+            hemisphere, input_date, input_time = data['hemisphere'], data['date'], data['time']
+            dt = datetime.strptime(f"{input_date} {input_time}", "%Y-%m-%d %H:%M")
+            terms = await prefetch((dt.year - 1, dt.year), Deadline())
+            result = core.convert_one(hemisphere, input_date, input_time, terms=terms)
+            trace.output = wsgi.conversion_output(result)
+            fields = request_fields(request, data)
+            with metrics.stage('serialize'):
+                return api_response(request, {'success': True, 'data': wsgi.project(result, fields)})
+        except Exception as e:
+            log_error('/api/convert')
+            trace.error = str(e)
+            return api_response(request, {'success': False, 'error': str(e)})
+
+
+async def convert_date_get(request):
+    try:
+        hemisphere, dt = core.parse_convert_query(request.query_params)
+        fields = request_fields(request)
+    except Exception as e:
+        log_error('/api/convert')
+        with wsgi.conversion_trace('/api/convert') as trace:
+            trace.input = dict(request.query_params)
+            trace.error = str(e)
+        return error_response(e, cacheable=False)
+    canonical = core.canonical_convert_query(hemisphere, dt, fields)
+    if request.url.query != canonical:
+        return RedirectResponse(
+            f"{request.url.path}?{canonical}", 301,
+            headers={'Cache-Control': f'public, max-age={wsgi.LOCAL_TERMS_MAX_AGE}'})
+
+    with wsgi.conversion_trace('/api/convert') as trace:
+        trace.input = {'hemisphere': hemisphere, 'date': f"{dt:%Y-%m-%d}", 'time': f"{dt:%H:%M}"}
+        try:
+            terms = await prefetch((dt.year - 1, dt.year), Deadline())
+            result = core.convert_one(hemisphere, trace.input['date'], trace.input['time'], terms=terms)
+            trace.output = wsgi.conversion_output(result)
+            with metrics.stage('serialize'):
+                asset = wsgi.json_asset(core.dump_json({'success': True, 'data': wsgi.project(result, fields)}))
+            return asset_response(asset, request, f'public, max-age={wsgi.ONLINE_TERMS_MAX_AGE}')
+        except Exception as e:
+            log_error('/api/convert')
+            trace.error = str(e)
+            return error_response(e, cacheable=False)
+
+
+async def convert_batch(request):
+    with wsgi.conversion_trace('/api/convert_batch') as trace:
+        try:
+            data = await request_data(request)
+            records = data['records'] if isinstance(data, dict) else data
+            trace.input = {'records': len(records)}
+            if len(records) > wsgi.BATCH_MAX_RECORDS:
+                trace.error = f'单次最多转换 {wsgi.BATCH_MAX_RECORDS} 条记录'
+                return api_response(request, {'success': False, 'error': trace.error})
+            await prefetch(core.record_years(records), Deadline())
+            results = await run_in_threadpool(core.convert_records, records, cache_only())
+            trace.output = wsgi.batch_output(results)
+            fields = request_fields(request, data)
+            with metrics.stage('serialize'):
+                return api_response(request, {'success': True, 'results': wsgi.project_results(results, fields)})
+        except Exception as e:
+            log_error('/api/convert_batch')
+            trace.error = str(e)
+            return api_response(request, {'success': False, 'error': str(e)})
+
+
+async def convert_stream(request):
+    lines = _request_lines(request)
+    mimetype = request.headers.get('content-type', '').split(';')[0].strip()
+    if mimetype == 'text/csv':
+        records = _csv_records(lines)
+    else:
+        records = _ndjson_records(lines)
+    return DuplexStreamingResponse(_stream_results(records, mimetype, request_fields(request)),
+                                   media_type='application/x-ndjson')
+
+
+async def _request_lines(request):
+    """逐行读取请求体（边收边产出，解码由各行的解析负责）"""
+    buffer = b''
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            yield line + b'\n'
+    if buffer:
+        yield buffer
+
+
+async def _ndjson_records(lines):
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        line, error = wsgi._decode_line(line)
+        if error is not None:
+            yield line_no, None, error
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, wsgi.app.json.loads(line), None
+        except ValueError as e:
+            yield line_no, None, f"JSON 解析失败：{e}"
+
+
+class _LineFeed:
+    """交给 csv.DictReader 的行队列：队列为空时本轮迭代结束，之后可继续追加"""
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def _csv_records(lines):
+    """逐行解析带表头的 CSV，与 app._csv_records 相同（csv.DictReader，支持跨行的引号字段）
+
+    DictReader 只接受同步迭代器：每凑齐一条完整记录（引号成对）才交给它解析，
+    使它不会在引号字段中间读到输入结束。
+    """
+    feed = _LineFeed()
+    reader = csv.DictReader(feed)
+    quotes = 0
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        line, error = wsgi._decode_line(line)
+        if error is not None:
+            yield line_no, None, error
+            line = '\n'
+        feed.lines.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        quotes = 0
+        for row in _read_rows(reader):
+            yield reader.line_num, row, None
+    # 结尾引号未闭合的记录按 csv 模块的默认方式结束
+    for row in _read_rows(reader):
+        yield reader.line_num, row, None
+
+
+def _read_rows(reader):
+    """读出 reader 当前能解析的所有行"""
+    while True:
+        try:
+            yield next(reader)
+        except StopIteration:
+            return
+
+
+async def _stream_results(records, mimetype, fields=None):
+    with wsgi.conversion_trace('/api/convert_stream') as trace:
+        trace.input = {'content_type': mimetype}
+        trace.output = {'records': 0, 'failed': 0}
+        chunk = []
+        async for item in records:
+            chunk.append(item)
+            if len(chunk) >= wsgi.STREAM_CHUNK_SIZE:
+                yield await _convert_chunk(chunk, trace, fields)
+                chunk = []
+        if chunk:
+            yield await _convert_chunk(chunk, trace, fields)
+
+
+async def _convert_chunk(chunk, trace, fields):
+    await prefetch(core.record_years(record for _, record, error in chunk if error is None), Deadline())
+    return await run_in_threadpool(wsgi._convert_chunk, chunk, cache_only(), trace, fields)
+
+
+async def readyz(request):
+    ready = core.warmup.ready.is_set()
+    return Response(core.dump_json({'ready': ready}) + '\n', 200 if ready else 503,
+                    media_type='application/json')
+
+
+async def metrics_endpoint(request):
+    body, content_type = metrics.render()
+    return Response(body, headers={'Content-Type': content_type})
+
+
+async def cache_stats(request):
+    return json_response({'success': True, 'online_terms': core.online_terms_cache.stats(),
+                          'results': core.result_cache.stats()})
+
+
+class RequestTimer:
+    """按路由记录请求耗时（到响应头发出为止，与 Flask 版本一致）"""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.application(scope, receive, send)
+        started = time.perf_counter()
+
+        async def timed_send(message):
+            if message['type'] == 'http.response.start':
+                route = scope.get('route')
+                if route is not None and route.path != '/metrics':
+                    metrics.REQUEST_SECONDS.labels(route.path, scope['method'], str(message['status'])).observe(
+                        time.perf_counter() - started)
+            await send(message)
+
+        await self.application(scope, receive, timed_send)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(application):
+    # 直接用 uvicorn 运行时在这里启动预热（gunicorn 下由 gunicorn.conf.py 启动，重复调用无效）
+    core.warmup.start()
+    yield
+    core.warmup.stop()
+    await upstream.aclose()
+    if wsgi.request_log is not None:
+        wsgi.request_log.close()
+
+
+app = Starlette(routes=[
+    Route('/', index),
+    Route('/assets/{filename:path}', static_asset),
+    Route('/api/solar_terms/{year:int}', get_solar_terms),
+    Route('/api/convert', convert_date, methods=['POST']),
+    Route('/api/convert', convert_date_get, methods=['GET']),
+    Route('/api/convert_batch', convert_batch, methods=['POST']),
+    Route('/api/convert_stream', convert_stream, methods=['POST']),
+    Route('/readyz', readyz),
+    Route('/metrics', metrics_endpoint),
+    Route('/api/cache_stats', cache_stats),
+    Route('/{tenant_key}/', tenant_index),
+], lifespan=lifespan, middleware=[Middleware(RequestTimer)])
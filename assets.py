@@ -0,0 +1,75 @@
+"""
+自托管的前端静态资源
+
+启动时扫描 static/ 目录（不含 src/ 源文件），为每个文件生成预压缩版本，
+并以内容哈希作为文件名的一部分（如 /assets/css/app.3f9c1d2ab0.css），
+内容变化即 URL 变化，因此可以设置长期 immutable 缓存。
+
+static/vendor/ 下的第三方文件由 build_assets.py vendor 在构建镜像时下载；
+本地缺失时页面回退到固定版本的 CDN 地址。
+"""
+
+import hashlib
+import mimetypes
+import os
+
+from precompressed import PrecompressedAsset
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSETS_PREFIX = '/assets/'
+ASSETS_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+FLATPICKR_VERSION = '4.6.13'
+FLATPICKR_CDN = f"https://cdn.jsdelivr.net/npm/flatpickr@{FLATPICKR_VERSION}/dist/"
+
+# 第三方文件：本地路径 -> 固定版本的下载地址
+VENDOR_FILES = {
+    'vendor/flatpickr/flatpickr.min.css': FLATPICKR_CDN + 'flatpickr.min.css',
+    'vendor/flatpickr/themes/material_blue.css': FLATPICKR_CDN + 'themes/material_blue.css',
+    'vendor/flatpickr/flatpickr.min.js': FLATPICKR_CDN + 'flatpickr.min.js',
+    'vendor/flatpickr/l10n/zh.js': FLATPICKR_CDN + 'l10n/zh.js',
+}
+
+# 不对外提供的源文件目录
+_SKIP_DIRS = {'src'}
+
+
+class AssetBundle:
+    """static/ 目录下全部资源，按带哈希的文件名提供"""
+
+    def __init__(self, root=STATIC_DIR, prefix=ASSETS_PREFIX, fallbacks=VENDOR_FILES):
+        self.root = root
+        self.prefix = prefix
+        self.fallbacks = fallbacks
+        self.files = {}  # 带哈希的相对路径 -> PrecompressedAsset
+        self.urls = {}   # 原始相对路径 -> URL
+        self.load()
+
+    def load(self):
+        if not os.path.isdir(self.root):
+            return
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root:
+                dirnames[:] = [d for d in dirnames if d not in _SKIP_DIRS]
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                path = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                with open(full_path, 'rb') as f:
+                    body = f.read()
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                stem, ext = os.path.splitext(path)
+                hashed = f"{stem}.{hashlib.sha256(body).hexdigest()[:10]}{ext}"
+                self.files[hashed] = PrecompressedAsset(body, mimetype)
+                self.urls[path] = self.prefix + hashed
+
+    def url(self, path):
+        """模板中使用的资源地址；本地没有的第三方文件回退到 CDN"""
+        if path in self.urls:
+            return self.urls[path]
+        if path in self.fallbacks:
+            return self.fallbacks[path]
+        raise KeyError(f"静态资源不存在：{path}")
+
+    def get(self, hashed):
+        """按带哈希的相对路径查找，不存在时返回 None"""
+        return self.files.get(hashed)
@@ -0,0 +1,154 @@
+"""
+转换热路径的微基准
+
+每项用 timeit 自动确定循环次数，重复多轮取最快一轮的单次耗时；
+结果可保存为基线（JSON），之后的运行按百分比与基线比较，超过阈值记为回退。
+在线数据源关闭（结果只反映本地计算），与线上数值不可直接比较，
+但同一台机器上前后两次的相对变化是可靠的。
+
+用法：
+python benchmarks.py --save                # 运行并保存为基线
+python benchmarks.py                       # 与基线比较
+python benchmarks.py --check --threshold 15  # 有超过 15% 的回退时以非零状态退出（用于 CI）
+python benchmarks.py -k convert            # 只运行名称包含 convert 的项
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime
+
+# 只测本地计算：关闭在线数据源（忽略环境中已设置的地址，不向真实上游发请求）与跨进程缓存，保证结果可复现
+os.environ.setdefault('TERM_CACHE_BACKEND', 'memory')
+os.environ['ONLINE_TERMS_URL'] = ''
+# 请求日志照常入队（计入耗时），后台写入丢弃
+os.environ.setdefault('REQUEST_LOG_PATH', os.devnull)
+
+import app  # noqa: E402
+import core  # noqa: E402
+from solar_terms import compute_term_minutes, datetime_to_minutes, term_table, term_timeline  # noqa: E402
+from upstream import Deadline  # noqa: E402
+
+BASELINE_PATH = os.environ.get('BENCHMARK_BASELINE', 'benchmark_baseline.json')
+
+_MINUTES = datetime_to_minutes(datetime(2008, 3, 5, 12, 0))
+_RECORDS = [{'hemisphere': 'south' if i % 3 else 'north', 'date': f"{1950 + i % 70}-{1 + i % 12:02d}-15",
+             'time': f"{i % 24:02d}:{i % 60:02d}"} for i in range(1000)]
+
+
+def _convert_uncached():
+    core.result_cache.invalidate()
+    return core.convert_one('south', '2008-03-05', '12:00')
+
+
+def _benchmarks():
+    """名称 -> 无参函数"""
+    timeline = term_timeline()
+    result = core.convert_one('south', '2008-03-05', '12:00')
+    client = app.app.test_client()
+    return {
+        'timeline_locate': lambda: timeline.locate(_MINUTES),
+        'term_range': lambda: core.term_range(timeline, timeline.locate(_MINUTES)),
+        'term_table_to_list': lambda: term_table(2008).to_list(),
+        'compute_term_minutes_1900_2100': lambda: compute_term_minutes(1900, 2100),
+        'convert_one_cached': lambda: core.convert_one('south', '2008-03-05', '12:00'),
+        'convert_one_uncached': _convert_uncached,
+        'convert_records_1000': lambda: core.convert_records(_RECORDS, online=False),
+        'dump_json_result': lambda: core.dump_json({'success': True, 'data': result}),
+        'solar_terms_body': lambda: app.solar_terms_body(2008, Deadline(0)),
+        'request_post_convert': lambda: client.post(
+            '/api/convert', json={'hemisphere': 'south', 'date': '2008-03-05', 'time': '12:00'}),
+        'request_get_convert': lambda: client.get('/api/convert?h=south&dt=2008-03-05T12:00'),
+        'request_solar_terms': lambda: client.get('/api/solar_terms/2008'),
+    }
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """单次调用耗时（秒）：自动确定循环次数，取 repeat 轮中最快的一轮"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run(pattern=None, repeat=5):
+    results = {}
+    for name, func in _benchmarks().items():
+        if pattern and pattern not in name:
+            continue
+        func()  # 预热（索引映射、缓存等）
+        results[name] = measure(func, repeat)
+        print(f"  {name:<34}{_format(results[name]):>12}", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """与基线比较，返回 (行列表, 是否有回退)"""
+    rows = []
+    regressed = False
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append((name, seconds, None, None, '新增'))
+            continue
+        delta = (seconds - base) / base * 100
+        status = ''
+        if delta > threshold:
+            status = '回退'
+            regressed = True
+        elif delta < -threshold:
+            status = '提升'
+        rows.append((name, seconds, base, delta, status))
+    return rows, regressed
+
+
+def _format(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} µs"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="转换热路径微基准")
+    parser.add_argument('-k', dest='pattern', help="只运行名称包含该字符串的项")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="基线文件")
+    parser.add_argument('--save', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--threshold', type=float, default=10, help="变化超过该百分比才算回退/提升")
+    parser.add_argument('--check', action='store_true', help="有回退时以状态码 1 退出")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print("运行基准：", file=sys.stderr)
+    results = run(args.pattern, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    rows, regressed = compare(results, baseline, args.threshold)
+    print(f"{'名称':<32}{'本次':>12}{'基线':>12}{'变化':>10}")
+    for name, seconds, base, delta, status in rows:
+        base_text = _format(base) if base is not None else '-'
+        delta_text = f"{delta:+.1f}%" if delta is not None else '-'
+        print(f"{name:<34}{_format(seconds):>12}{base_text:>12}{delta_text:>10}  {status}")
+
+    if args.save:
+        if args.pattern:
+            results = {**baseline, **results}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'saved_at': datetime.now().isoformat(timespec='seconds'),
+                       'results': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"已保存基线：{args.baseline}", file=sys.stderr)
+
+    if args.check and regressed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
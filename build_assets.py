@@ -0,0 +1,68 @@
+"""
+构建前端静态资源
+
+- css：用 Tailwind CLI v3 按页面实际使用的类名生成压缩后的 static/css/app.css
+  （需要 v3 的 tailwindcss 可执行文件，如 npm install -D tailwindcss@3 或 v3 的独立版本；
+  v4 的输出依赖 oklch()、@property、@layer 等新特性，Safari 16.4 以前与较旧的
+  Android WebView 无法正常显示。生成结果已提交到仓库，只有修改页面样式时才需要重新构建）
+- vendor：下载固定版本的第三方文件（flatpickr）到 static/vendor/，已存在的文件跳过
+
+用法：
+python build_assets.py css
+python build_assets.py vendor
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+import requests
+
+from assets import STATIC_DIR, VENDOR_FILES
+
+
+def build_css(tailwind):
+    usage = subprocess.run([tailwind, '--help'], capture_output=True, text=True).stdout
+    match = re.search(r'tailwindcss v(\d+)[\d.]*', usage)
+    if match is None or match.group(1) != '3':
+        sys.exit(f"需要 Tailwind CLI v3（{tailwind}：{match.group(0) if match else '无法识别版本'}）")
+    subprocess.run([tailwind, '-c', os.path.join(STATIC_DIR, 'src', 'tailwind.config.js'),
+                    '-i', os.path.join(STATIC_DIR, 'src', 'app.css'),
+                    '-o', os.path.join(STATIC_DIR, 'css', 'app.css'), '--minify'],
+                   check=True)
+
+
+def download_vendor():
+    for path, url in VENDOR_FILES.items():
+        target = os.path.join(STATIC_DIR, *path.split('/'))
+        if os.path.exists(target):
+            # 版本固定，已下载的文件不会变化
+            continue
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # 先写临时文件再改名，下载中断不会留下不完整的文件
+        with open(target + '.tmp', 'wb') as f:
+            f.write(response.content)
+        os.replace(target + '.tmp', target)
+        print(f"{path}：{len(response.content)} 字节", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="构建前端静态资源")
+    parser.add_argument('target', choices=['css', 'vendor'])
+    parser.add_argument('--tailwind', default=shutil.which('tailwindcss') or 'tailwindcss',
+                        help="Tailwind CLI 可执行文件路径")
+    args = parser.parse_args(argv)
+
+    if args.target == 'css':
+        build_css(args.tailwind)
+    else:
+        download_vendor()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+离线批量转换命令行工具
+
+与 /api/convert 使用同一套转换逻辑，但不启动 Web 服务。输入文件按块分发给
+多进程并行转换，输出为 JSONL，每行与 /api/convert 的响应体相同，顺序与输入一致。
+
+输入格式：
+- CSV：表头包含 hemisphere,date,time
+- JSONL：每行一个 {"hemisphere": ..., "date": ..., "time": ...}
+
+用法：
+python convert_cli.py input.csv -o output.jsonl
+python convert_cli.py input.jsonl -o output.jsonl --workers 8 --chunk-size 5000
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import core
+from upstream import Deadline
+
+
+def read_chunks(path, input_format, chunk_size):
+    """按块读取输入文件；CSV 解析为字典，JSONL 保留原始行交给子进程解析"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if input_format == 'csv':
+            rows = csv.DictReader(f)
+        else:
+            rows = (line for line in f if line.strip())
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def convert_chunk(args):
+    """子进程中转换一块记录，返回输出行列表"""
+    rows, online = args
+    records = []
+    errors = {}
+    for i, row in enumerate(rows):
+        if isinstance(row, str):
+            try:
+                row = json.loads(row)
+            except ValueError as e:
+                errors[i] = f"JSON 解析失败：{e}"
+        records.append(row)
+
+    valid = [record for i, record in enumerate(records) if i not in errors]
+    converted = iter(core.convert_records(valid, Deadline() if online else None, online=online))
+    lines = []
+    for i in range(len(records)):
+        result = {'success': False, 'error': errors[i]} if i in errors else next(converted)
+        lines.append(core.dump_json(result))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="南北半球八字排盘日期批量转换")
+    parser.add_argument('input', help="输入文件（.csv 或 .jsonl）")
+    parser.add_argument('-o', '--output', help="输出 JSONL 文件，默认输出到标准输出")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="输入格式，默认按扩展名判断")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="进程数，默认为 CPU 核数")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="每块记录数")
+    parser.add_argument('--online', action='store_true', help="同时查询在线节气数据源（默认只用本地数据）")
+    args = parser.parse_args(argv)
+
+    input_format = args.format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+
+    started = time.perf_counter()
+    total = 0
+    # 限制同时在途的块数，避免一次性把整个输入读进内存
+    pending = deque()
+    with Pool(args.workers) as pool:
+        def drain(limit):
+            nonlocal total
+            while len(pending) > limit:
+                lines = pending.popleft().get()
+                out.write('\n'.join(lines) + '\n')
+                total += len(lines)
+                elapsed = time.perf_counter() - started
+                print(f"\r已转换 {total} 条，{total / elapsed:.0f} 条/秒", end='', file=sys.stderr)
+
+        for chunk in read_chunks(args.input, input_format, args.chunk_size):
+            pending.append(pool.apply_async(convert_chunk, ((chunk, args.online),)))
+            drain(args.workers * 2)
+        drain(0)
+
+    if out is not sys.stdout:
+        out.close()
+    elapsed = time.perf_counter() - started
+    print(f"\r完成：{total} 条，用时 {elapsed:.2f} 秒，{total / max(elapsed, 1e-9):.0f} 条/秒",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+"""
+南北半球日期转换的核心逻辑（不依赖 Flask）
+
+app.py（Flask）、asgi.py 与 convert_cli.py 共用：节气时间轴、单条与批量转换、
+在线节气数据的获取与缓存、预热，以及与 API 响应体相同的 JSON 序列化。
+导入本模块不会加载 Flask；requests 在第一次请求在线数据源时才导入（见 upstream.py）。
+
+gunicorn 预加载（gunicorn.conf.py）时 master 调用 preload() 映射节气索引，
+worker fork 后以写时复制共享。
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+from urllib.parse import quote
+
+import numpy as np
+
+from solar_terms import Term, datetime_to_minutes, minutes_from_terms, minutes_to_datetime, term_minutes, term_timeline
+import metrics
+import serializers
+from term_cache import ResultCache, TermCache, create_backend
+from upstream import UPSTREAM_TIMEOUT, Deadline, UpstreamClient, UpstreamUnavailable
+from warmup import REFRESH_INTERVAL, Warmup
+
+logger = logging.getLogger(__name__)
+
+# 在线节气数据缓存（失败结果缓存 5 分钟），默认通过 SQLite 在所有 worker 间共享
+online_terms_cache = TermCache(ttl=24 * 3600, negative_ttl=300,
+                               backend=create_backend('online_terms', maxsize=512))
+# 完整转换结果的 LRU 缓存，键为 (半球, 分钟时间戳, 在线数据版本)
+# 版本只在本进程内递增：其他 worker 刷新的数据要等结果过期后才生效，TTL 默认与后台刷新间隔相同
+result_cache = ResultCache(maxsize=int(os.environ.get('RESULT_CACHE_SIZE', '4096')),
+                           ttl=float(os.environ.get('RESULT_CACHE_TTL', str(REFRESH_INTERVAL))))
+# 在线节气数据源（连接池 + 熔断），设为空则只使用本地计算
+# 这里可以对接真实的节气API，示例：使用免费的农历API
+# 压测时可指向本地模拟服务（upstream_stub.py）
+ONLINE_TERMS_URL = os.environ.get('ONLINE_TERMS_URL', "https://api.xygeng.cn/lunar/solar/{year}/1/1")
+upstream = UpstreamClient()
+
+# GET 转换接口接受的半球写法
+HEMISPHERE_ALIASES = {
+    'north': 'north', 'n': 'north', '北': 'north', '北半球': 'north',
+    'south': 'south', 's': 'south', '南': 'south', '南半球': 'south'
+}
+
+# 节气对应关系
+TERM_PAIRS = {
+    '立春': '立秋', '雨水': '处暑', '惊蛰': '白露', '春分': '秋分',
+    '清明': '寒露', '谷雨': '霜降', '立夏': '立冬', '小满': '小雪',
+    '芒种': '大雪', '夏至': '冬至', '小暑': '小寒', '大暑': '大寒',
+    '立秋': '立春', '处暑': '雨水', '白露': '惊蛰', '秋分': '春分',
+    '寒露': '清明', '霜降': '谷雨', '立冬': '立夏', '小雪': '小满',
+    '大雪': '芒种', '冬至': '夏至', '小寒': '小暑', '大寒': '大暑'
+}
+
+
+def preload():
+    """fork 之前在 master 中调用：映射节气索引（缺失时生成）并建好时间轴，
+    启用了在线数据源时预先导入 requests
+    """
+    term_timeline()
+    if ONLINE_TERMS_URL:
+        upstream.preload()
+
+
+def http_date(dt):
+    """HTTP 日期格式（与 Flask 默认 JSON 中的 datetime 相同，不带时区的时间按 UTC）"""
+    dt = dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+    return format_datetime(dt, usegmt=True)
+
+
+@lru_cache(maxsize=8192)
+def serialized_term_detail(index, minutes):
+    """序列化用的节气详情（datetime 已转为 HTTP 日期字符串），同一节气只生成一次，不可修改"""
+    detail = Term(index, minutes).to_detail()
+    detail['datetime'] = http_date(detail['datetime'])
+    return detail
+
+
+def json_default(o):
+    """Term 与 datetime 的 JSON 表示"""
+    if isinstance(o, Term):
+        return serialized_term_detail(o.index, o.minutes)
+    if isinstance(o, datetime):
+        return http_date(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dump_json(obj):
+    """与 API 响应体相同的紧凑、键排序 JSON（安装了 orjson 时由它生成）"""
+    if serializers.orjson is not None:
+        return serializers.dumps_json(obj, json_default)
+    return json.dumps(obj, default=json_default, sort_keys=True, separators=(',', ':'))
+
+
+def parse_convert_query(args):
+    """解析 GET 转换参数，返回 (规范化的半球, 精确到分钟的 datetime)"""
+    hemisphere = (args.get('h') or args.get('hemisphere') or '').strip().lower()
+    hemisphere = HEMISPHERE_ALIASES.get(hemisphere)
+    if hemisphere is None:
+        raise ValueError("参数 h 必须为 north 或 south")
+    value = args.get('dt')
+    if value is None and 'date' in args:
+        value = f"{args['date']}T{args.get('time', '12:00')}"
+    if not value:
+        raise ValueError("缺少参数 dt（如 2024-03-05T12:00）")
+    dt = datetime.fromisoformat(value.strip().replace(' ', 'T'))
+    if dt.tzinfo is not None:
+        raise ValueError("dt 为北京时间，不能带时区")
+    return hemisphere, dt.replace(second=0, microsecond=0)
+
+
+def canonical_convert_query(hemisphere, dt, fields=None):
+    """GET 转换接口的规范查询字符串（已百分号编码，可直接与原始查询字符串比较）"""
+    query = f"h={hemisphere}&dt={dt:%Y-%m-%dT%H:%M}"
+    if fields:
+        query += f"&fields={quote(','.join(sorted(fields)), safe=',')}"
+    return query
+
+
+def convert_one(hemisphere, input_date, input_time, deadline=None, terms=None):
+    """转换单条记录，返回与 /api/convert 的 data 相同的字典
+
+    terms 为调用方已取得的在线节气数据 {年份: 数据}（见 load_timeline）。
+    """
+    # 解析输入日期时间
+    dt = datetime.strptime(f"{input_date} {input_time}", "%Y-%m-%d %H:%M")
+    minutes = datetime_to_minutes(dt)
+
+    # 结果会原样带回输入的字符串，只缓存规范写法的输入
+    key = None
+    if input_date == f"{dt:%Y-%m-%d}" and input_time == f"{dt:%H:%M}":
+        key = ('north' if hemisphere == 'north' else 'south', minutes, online_terms_cache.version)
+        result = result_cache.get(key)
+        if result is not None:
+            metrics.count_source('result_cache')
+            return result
+
+    # 获取节气时间轴（只与日期本身有关，不依赖客户端传来的 year）
+    timeline = load_timeline((dt.year - 1, dt.year), deadline, terms)
+
+    # 找到所处的节气区间
+    with metrics.stage('lookup'):
+        pos = timeline.locate(minutes)
+
+    with metrics.stage('convert'):
+        output_minutes = None
+        if hemisphere != 'north':
+            # 南半球：对应节气时刻加上与当前节气的时间差
+            if pos < 12:
+                raise ValueError(f"日期超出支持范围（{timeline.start_year}-{timeline.end_year}年）")
+            output_minutes = int(timeline.minutes[pos - 12]) + minutes - int(timeline.minutes[pos])
+
+        result = build_result(hemisphere, input_date, input_time, timeline, pos, output_minutes)
+    if key is not None:
+        result_cache.set(key, result)
+    return result
+
+
+def record_years(records):
+    """转换这些记录需要的节气年份（无法解析的记录跳过）"""
+    years = set()
+    for record in records:
+        try:
+            year = datetime.strptime(record['date'], "%Y-%m-%d").year
+        except Exception:
+            continue
+        years.update((year - 1, year))
+    return sorted(years)
+
+
+def convert_records(records, deadline=None, online=True):
+    """批量转换，区间查找与南半球时间偏移都在 NumPy 数组上一次完成
+
+    返回与 records 一一对应的列表，每项为 {'success': True, 'data': ...}
+    或 {'success': False, 'error': ...}，单条出错不影响其他记录。
+    online 为 False 时只使用本地计算的节气数据。
+    """
+    results = [None] * len(records)
+    parsed = []
+    for i, record in enumerate(records):
+        try:
+            dt = datetime.strptime(f"{record['date']} {record['time']}", "%Y-%m-%d %H:%M")
+            parsed.append((i, record['hemisphere'], record['date'], record['time'], dt))
+        except Exception as e:
+            results[i] = {'success': False, 'error': str(e)}
+    if not parsed:
+        return results
+
+    # 按年份收集需要的节气数据（在线数据按年覆盖本地时间轴）
+    years = sorted({y for *_, dt in parsed for y in (dt.year - 1, dt.year)})
+    timeline = load_timeline(years, deadline) if online else term_timeline()
+
+    minutes = np.array([datetime_to_minutes(dt) for *_, dt in parsed], dtype=np.int64)
+    south = np.array([hemisphere != 'north' for _, hemisphere, *_ in parsed])
+    with metrics.stage('lookup'):
+        pos = timeline.locate_many(minutes)
+    last = len(timeline.minutes) - 1
+    valid = (pos > 0) & (pos < last) & (~south | (pos >= 12))
+
+    # 南半球：对应节气（往前 12 个位置）时刻加上与当前节气的时间差
+    safe_pos = np.where(valid, pos, 12)
+    output_minutes = np.where(
+        south, timeline.minutes[safe_pos - 12] + (minutes - timeline.minutes[safe_pos]), minutes)
+    output_pos = timeline.locate_many(output_minutes)
+    valid &= (output_pos > 0) & (output_pos < last)
+
+    error = f"日期超出支持范围（{timeline.start_year}-{timeline.end_year}年）"
+    with metrics.stage('convert'):
+        for k, (i, hemisphere, input_date, input_time, _) in enumerate(parsed):
+            if not valid[k]:
+                results[i] = {'success': False, 'error': error}
+                continue
+            results[i] = {'success': True, 'data': build_result(
+                hemisphere, input_date, input_time, timeline, int(pos[k]),
+                int(output_minutes[k]) if south[k] else None, int(output_pos[k]))}
+    return results
+
+
+def build_result(hemisphere, input_date, input_time, timeline, pos, output_minutes=None, output_pos=None):
+    """组装转换结果
+
+    pos 为输入时刻在时间轴上的位置；南半球需给出转换后的时刻 output_minutes，
+    output_pos 为其位置（未给出时自动查找）。
+    """
+    current_term_info = term_range(timeline, pos)
+
+    if hemisphere == 'north':
+        # 北半球不转换
+        return {
+            'input_hemisphere': '北半球（原始）',
+            'input_datetime': f"{input_date} {input_time}",
+            'current_term': current_term_info['current'].name,
+            'actual_term': current_term_info['current'].name,
+            'output_datetime': f"{input_date} {input_time}",
+            'output_date': input_date,
+            'output_time': input_time,
+            'prev_term': current_term_info['prev'],
+            'current_term_detail': current_term_info['current'],
+            'next_term': current_term_info['next']
+        }
+
+    # 南半球转换：对应节气是时间轴上往前 12 个位置（约半年前）的那个节气
+    south_term = timeline.term(pos - 12)
+    output_dt = minutes_to_datetime(output_minutes)
+    if output_pos is None:
+        output_pos = timeline.locate(output_minutes)
+
+    # 转换后的节气区间
+    output_term_info = term_range(timeline, output_pos)
+
+    return {
+        'input_hemisphere': '南半球（原始）',
+        'input_datetime': f"{input_date} {input_time}",
+        'current_term': current_term_info['current'].name,
+        'actual_term': TERM_PAIRS[current_term_info['current'].name],
+        'output_datetime': output_dt.strftime("%Y-%m-%d %H:%M"),
+        'output_date': output_dt.strftime("%Y-%m-%d"),
+        'output_time': output_dt.strftime("%H:%M"),
+        'prev_term': current_term_info['prev'],
+        'current_term_detail': current_term_info['current'],
+        'next_term': current_term_info['next'],
+        'output_prev_term': output_term_info['prev'],
+        'output_current_term': output_term_info['current'],
+        'output_next_term': output_term_info['next'],
+        'south_term_detail': south_term.to_dict()
+    }
+
+
+def load_timeline(years, deadline=None, terms=None):
+    """获取全局节气时间轴，years 中有在线数据的年份覆盖本地计算结果
+
+    terms 为已取得的在线数据 {年份: 数据}（如 ASGI 异步预取的结果），给出时直接使用，
+    不再读取在线数据缓存。
+    """
+    online = {}
+    for year in years:
+        year_terms = terms.get(year) if terms is not None else fetch_online_solar_terms(year, deadline)
+        if year_terms:
+            online[year] = year_terms
+    metrics.count_source('online' if online else 'local')
+
+    with metrics.stage('terms'):
+        timeline = term_timeline()
+        for year, terms in online.items():
+            timeline = timeline.with_year(year, minutes_from_terms(terms))
+    return timeline
+
+
+def term_range(timeline, pos):
+    """时间轴位置 pos 处的前一个、当前、下一个节气"""
+    return {
+        'position': pos,
+        'prev': timeline.term(pos - 1),
+        'current': timeline.term(pos),
+        'next': timeline.term(pos + 1)
+    }
+
+
+def fetch_online_solar_terms(year, deadline=None):
+    """从在线API获取节气数据（带缓存，并发请求同一年份只访问一次上游）"""
+    if not ONLINE_TERMS_URL:
+        return None
+    if deadline is not None and deadline.exhausted():
+        # 预算已耗尽（如 ASGI 预取之后的只读调用）：只读缓存，不取加载租约
+        return online_terms_cache.get(year)
+    try:
+        return online_terms_cache.get_or_load(
+            year, lambda y: _request_online_solar_terms(y, deadline),
+            timeout=deadline.remaining() if deadline else None)
+    except UpstreamUnavailable:
+        # 熔断中或预算耗尽：不缓存，直接使用本地数据
+        return None
+
+
+def _request_online_solar_terms(year, deadline=None):
+    """请求在线API"""
+    started = time.perf_counter()
+    try:
+        response = upstream.get(ONLINE_TERMS_URL.format(year=year), deadline)
+    except UpstreamUnavailable:
+        # 熔断或预算耗尽，请求未发出
+        metrics.count_upstream('skipped')
+        raise
+    except upstream.errors as e:
+        metrics.observe_stage('upstream', time.perf_counter() - started)
+        metrics.count_upstream('timeout' if upstream.is_timeout(e) else 'error')
+        logger.warning("在线节气数据获取失败（%s年）：%s", year, e)
+        return None
+    metrics.observe_stage('upstream', time.perf_counter() - started)
+    metrics.count_upstream('success')
+    return parse_online_solar_terms(year, response)
+
+
+def parse_online_solar_terms(year, response):
+    """解析在线API的响应，失败返回None"""
+    if response.status_code == 200:
+        # 解析API返回的数据
+        # 这里需要根据实际API格式处理
+        pass
+
+    return None  # API失败返回None
+
+
+def _warm_year(year):
+    """预热单个年份：映射本地索引并填充在线数据缓存"""
+    term_minutes(year)
+    fetch_online_solar_terms(year, Deadline())
+
+
+def _refresh_year(year):
+    """在线数据缓存即将过期时提前刷新（后台执行，不受请求预算限制）"""
+    if not ONLINE_TERMS_URL:
+        return
+    version = online_terms_cache.version
+    try:
+        online_terms_cache.refresh(
+            year, lambda y: _request_online_solar_terms(y, Deadline(UPSTREAM_TIMEOUT * 1000)),
+            margin=2 * warmup.interval)
+    except UpstreamUnavailable:
+        return
+    if online_terms_cache.version != version:
+        # 存入了新数据：旧版本的转换结果不会再被命中，直接释放（重新加载到失败结果时版本不变，保留）
+        result_cache.invalidate()
+
+
+# 预热与后台刷新，由 gunicorn.conf.py 在每个 worker 启动后调用 warmup.start()
+warmup = Warmup(_warm_year, _refresh_year)
@@ -0,0 +1,60 @@
+"""
+gunicorn 配置（gunicorn 默认读取当前目录下的 gunicorn.conf.py）
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+
+# HUP 时 gunicorn 会在同一个 master 中重新执行本文件，只有首次启动时才做下面的一次性操作
+first_start = os.environ.get('SOUTH_GUNICORN_MASTER') != str(os.getpid())
+os.environ['SOUTH_GUNICORN_MASTER'] = str(os.getpid())
+
+# Prometheus 多进程模式：各 worker 的指标写入该目录，/metrics 抓取时合并
+# 必须在导入 prometheus_client 之前设置并建好目录：预加载时 master 在 on_starting 之前
+# 就导入应用，metrics.py 导入时即在该目录中创建指标文件
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'south-api-metrics'))
+# 启动时清空上一次运行留下的指标文件；HUP 时目录中是正在运行的 worker 的指标，不能清空
+if first_start:
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+# 预加载：master 导入应用、映射节气索引后再 fork，worker 以写时复制共享已加载的模块、
+# 预压缩的页面与静态资源，启动更快、总内存更少。GUNICORN_PRELOAD=0 关闭
+# （此时 HUP 可重新加载代码；开启时更新代码需重启 master）
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+if preload_app and first_start:
+    # 导入期间不做垃圾回收，避免回收留下的空洞使共享页在 worker 中被复制（on_starting 中恢复；
+    # on_starting 只在首次启动时调用，HUP 时关闭后将无人恢复）
+    gc.disable()
+
+
+def on_starting(server):
+    """预加载时在 master 中建好节气时间轴"""
+    if server.cfg.preload_app:
+        import core
+        core.preload()
+        # 已有对象移出垃圾回收的扫描范围，worker 回收时不会写这些对象所在的页
+        gc.freeze()
+        gc.enable()
+
+
+def post_worker_init(worker):
+    """worker 启动后在后台预热节气数据"""
+    import core
+    core.warmup.start()
+
+
+def worker_exit(server, worker):
+    """worker 退出前写完请求日志队列中的记录"""
+    import app
+    if app.request_log is not None:
+        app.request_log.close()
+
+
+def child_exit(server, worker):
+    """worker 退出后清理其指标文件"""
+    import metrics
+    metrics.mark_process_dead(worker.pid)
@@ -0,0 +1,285 @@
+"""
+流量录制与回放压测工具
+
+- 录制：服务端设置环境变量 TRAFFIC_RECORD=traffic.jsonl 后，每个请求的形态
+  （方法、路径与查询参数、Content-Type、请求体）追加一行到该文件；
+  多个 worker 可写同一文件。流式转换的请求体不录制。
+- 生成：没有真实流量时按常见请求形态生成一份（默认时间 12:00 占多数）
+- 回放：按固定并发（--concurrency，闭环）或目标速率（--rate，开环）发送，
+  按接口统计 p50/p95/p99 延迟、错误数与吞吐量
+- 在线数据源可用 upstream_stub.py 在本地模拟（延迟、错误、超时可配置）
+- 也可直接回放服务端的请求日志（request_log.py，默认 logs/requests.jsonl）：
+  其中的单条转换记录按 POST /api/convert 回放，批量与流式记录只有条数，跳过
+
+用法：
+python loadtest.py generate -n 5000 -o traffic.jsonl
+python loadtest.py replay traffic.jsonl --url http://127.0.0.1:8000 --concurrency 20 --duration 30
+python loadtest.py replay traffic.jsonl --rate 200 --duration 60 --json report.json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TRAFFIC_FILE = 'traffic.jsonl'
+
+# 超过该大小的请求体不录制
+_MAX_RECORD_BODY = 1024 * 1024
+
+
+class TrafficRecorder:
+    """把请求形态追加到 JSONL 文件
+
+    每条记录用一次 O_APPEND 写入，多个进程同时写也不会交错。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._pid = os.getpid()
+
+    def record(self, method, path, content_type=None, body=None):
+        if self._pid != os.getpid():
+            # fork 之后重新打开，避免共享文件偏移
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        entry = {'method': method, 'path': path, 'endpoint': endpoint_of(path)}
+        if content_type:
+            entry['content_type'] = content_type
+        if body is not None and len(body) <= _MAX_RECORD_BODY:
+            entry['body'] = body
+        os.write(self._fd, (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+
+
+def load_traffic(path):
+    """读取录制的请求（也接受请求日志）"""
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries = [entry if 'path' in entry else _entry_from_log(entry) for entry in entries]
+    entries = [entry for entry in entries if entry is not None]
+    if not entries:
+        raise SystemExit(f"{path} 中没有请求，先录制或执行 generate")
+    for entry in entries:
+        entry.setdefault('endpoint', endpoint_of(entry['path']))
+    return entries
+
+
+def _entry_from_log(record):
+    """请求日志中的单条转换记录转为 POST /api/convert 请求，其他记录返回 None"""
+    data = record.get('input')
+    if record.get('endpoint') != '/api/convert' or not isinstance(data, dict) or 'hemisphere' not in data:
+        return None
+    return {'method': 'POST', 'path': '/api/convert', 'content_type': 'application/json',
+            'body': json.dumps(data, ensure_ascii=False)}
+
+
+def endpoint_of(path):
+    """按路由模板归类路径（统计用）"""
+    path = path.split('?', 1)[0]
+    return re.sub(r'/\d+(?=/|$)', '/<int>', path)
+
+
+def _random_record(rng):
+    day = date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 75))
+    # 不知道出生时间时常用默认的 12:00
+    hour, minute = (12, 0) if rng.random() < 0.4 else (rng.randrange(24), rng.randrange(60))
+    return {'hemisphere': 'south' if rng.random() < 0.7 else 'north',
+            'date': day.isoformat(), 'time': f"{hour:02d}:{minute:02d}"}
+
+
+def generate_traffic(n, seed=0):
+    """按页面与 API 的典型请求比例生成请求"""
+    rng = random.Random(seed)
+    entries = []
+    for _ in range(n):
+        roll = rng.random()
+        record = _random_record(rng)
+        if roll < 0.35:
+            entries.append({'method': 'GET', 'path': f"/api/convert?h={record['hemisphere']}"
+                                                     f"&dt={record['date']}T{record['time']}"})
+        elif roll < 0.6:
+            entries.append({'method': 'POST', 'path': '/api/convert', 'content_type': 'application/json',
+                            'body': json.dumps(record)})
+        elif roll < 0.85:
+            entries.append({'method': 'GET', 'path': f"/api/solar_terms/{rng.randrange(1950, 2027)}"})
+        elif roll < 0.95:
+            entries.append({'method': 'GET', 'path': '/'})
+        else:
+            records = [_random_record(rng) for _ in range(rng.randrange(10, 200))]
+            entries.append({'method': 'POST', 'path': '/api/convert_batch',
+                            'content_type': 'application/json', 'body': json.dumps({'records': records})})
+    for entry in entries:
+        entry['endpoint'] = endpoint_of(entry['path'])
+    return entries
+
+
+class Stats:
+    """按接口收集延迟与结果"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, seconds, ok):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def report(self, elapsed):
+        """每个接口及合计的请求数、错误数、吞吐量与延迟分位数（毫秒）"""
+        rows = {}
+        groups = dict(self.latencies)
+        groups['(全部)'] = [s for values in self.latencies.values() for s in values]
+        for endpoint, values in groups.items():
+            if not values:
+                continue
+            ms = np.array(values) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            errors = sum(self.errors.values()) if endpoint == '(全部)' else self.errors[endpoint]
+            rows[endpoint] = {
+                'requests': len(values), 'errors': errors, 'rps': round(len(values) / elapsed, 1),
+                'p50_ms': round(p50, 2), 'p95_ms': round(p95, 2), 'p99_ms': round(p99, 2),
+                'max_ms': round(float(ms.max()), 2)
+            }
+        return rows
+
+
+def send(session, base_url, entry, timeout):
+    """发送一个请求，返回是否成功（HTTP 状态与响应中的 success 字段）"""
+    headers = {'Accept-Encoding': 'gzip, br'}
+    if entry.get('content_type'):
+        headers['Content-Type'] = entry['content_type']
+    body = entry.get('body')
+    response = session.request(entry['method'], base_url + entry['path'],
+                               data=body.encode('utf-8') if body is not None else None,
+                               headers=headers, timeout=timeout, allow_redirects=True)
+    if response.status_code >= 400:
+        return False
+    if response.headers.get('Content-Type', '').startswith('application/json'):
+        return response.json().get('success', True) is not False
+    return True
+
+
+def replay(entries, base_url, concurrency=10, rate=None, duration=None, total=None, timeout=10):
+    """回放请求，返回 (Stats, 实际用时秒数)
+
+    rate 为空时以 concurrency 个并发循环发送（闭环）；否则按 rate 请求/秒的
+    固定节奏发出（开环），服务变慢时排队时间也计入延迟。
+    """
+    stats = Stats()
+    local = threading.local()
+    lock = threading.Lock()
+    counter = iter(range(sys.maxsize))
+    if total is None and duration is None:
+        total = len(entries)
+
+    def session():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+            local.session.mount('http://', adapter)
+            local.session.mount('https://', adapter)
+        return local.session
+
+    def one(entry, scheduled):
+        try:
+            ok = send(session(), base_url, entry, timeout)
+        except requests.RequestException:
+            ok = False
+        stats.add(entry['endpoint'], time.perf_counter() - scheduled, ok)
+
+    def next_index(deadline):
+        with lock:
+            i = next(counter)
+        if (total is not None and i >= total) or (deadline is not None and time.perf_counter() >= deadline):
+            return None
+        return i
+
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    if rate is None:
+        def worker():
+            while (i := next_index(deadline)) is not None:
+                one(entries[i % len(entries)], time.perf_counter())
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while (i := next_index(deadline)) is not None:
+                scheduled = started + i / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(one, entries[i % len(entries)], scheduled)
+
+    return stats, time.perf_counter() - started
+
+
+def print_report(rows, file=sys.stdout):
+    print(f"{'接口':<28}{'请求数':>8}{'错误':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)",
+          file=file)
+    for endpoint, row in rows.items():
+        print(f"{endpoint:<30}{row['requests']:>8}{row['errors']:>7}{row['rps']:>9}{row['p50_ms']:>9}"
+              f"{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="流量录制回放与压测")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help="生成典型请求")
+    gen.add_argument('-n', type=int, default=1000, help="请求数")
+    gen.add_argument('-o', '--output', default=DEFAULT_TRAFFIC_FILE)
+    gen.add_argument('--seed', type=int, default=0)
+
+    rep = sub.add_parser('replay', help="回放请求并统计延迟")
+    rep.add_argument('file', nargs='?', default=DEFAULT_TRAFFIC_FILE)
+    rep.add_argument('--url', default='http://127.0.0.1:8000', help="被测服务地址")
+    rep.add_argument('--concurrency', type=int, default=10, help="并发数（开环模式下为最大在途请求数）")
+    rep.add_argument('--rate', type=float, help="目标速率（请求/秒），不设置时按并发闭环发送")
+    rep.add_argument('--duration', type=float, help="持续时间（秒），到时后循环回放停止")
+    rep.add_argument('--requests', type=int, help="请求总数，默认把文件回放一遍")
+    rep.add_argument('--timeout', type=float, default=10)
+    rep.add_argument('--json', help="同时把报告写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        entries = generate_traffic(args.n, args.seed)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        print(f"已生成 {len(entries)} 个请求：{args.output}", file=sys.stderr)
+        return
+
+    entries = load_traffic(args.file)
+    stats, elapsed = replay(entries, args.url.rstrip('/'), args.concurrency, args.rate,
+                            args.duration, args.requests, args.timeout)
+    rows = stats.report(elapsed)
+    print_report(rows)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'url': args.url, 'concurrency': args.concurrency, 'rate': args.rate,
+                       'elapsed': round(elapsed, 3), 'endpoints': rows}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Prometheus 指标
+
+- 分阶段耗时直方图：上游请求、节气数据加载/计算、区间查找、转换、序列化
+- 缓存命中/未命中、上游请求结果（成功/错误/超时/跳过）、数据来源计数
+- 多 worker 聚合：设置 PROMETHEUS_MULTIPROC_DIR 时使用 prometheus_client 的
+  多进程模式，每个进程写自己的 mmap 文件，/metrics 抓取时合并所有进程
+  （gunicorn.conf.py 会自动设置该目录并在 worker 退出时清理）
+- 记录时只更新本进程的计数，不跨进程加锁；抓取时才汇总
+- 当前请求有 trace（request_log.Trace）时，阶段耗时与数据来源同时写入该 trace
+"""
+
+import os
+import time
+from contextvars import ContextVar
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+# 从 10 微秒到 5 秒，覆盖纯计算与上游请求
+_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+            0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGES = ('upstream', 'terms', 'lookup', 'convert', 'serialize')
+
+STAGE_SECONDS = Histogram(
+    'south_stage_duration_seconds', "各处理阶段耗时", ['stage'], buckets=_BUCKETS)
+REQUEST_SECONDS = Histogram(
+    'south_http_request_duration_seconds', "HTTP 请求耗时", ['endpoint', 'method', 'status'],
+    buckets=_BUCKETS)
+CACHE_REQUESTS = Counter(
+    'south_cache_requests_total', "缓存查询次数", ['cache', 'result'])
+UPSTREAM_REQUESTS = Counter(
+    'south_upstream_requests_total', "在线数据源请求结果", ['outcome'])
+DATA_SOURCE = Counter(
+    'south_data_source_total', "提供节气数据的来源（online / local / result_cache）", ['source'])
+ERRORS = Counter(
+    'south_errors_total', "处理出错的请求", ['endpoint'])
+REQUEST_LOG_DROPPED = Counter(
+    'south_request_log_dropped_total', "请求日志队列已满或写入失败而丢弃的记录")
+
+# 当前请求的 trace，没有时为 None
+current_trace = ContextVar('current_trace', default=None)
+
+# 预先绑定标签，记录时不再查找子指标
+_stage_children = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+_source_children = {source: DATA_SOURCE.labels(source) for source in ('online', 'local', 'result_cache')}
+_upstream_children = {outcome: UPSTREAM_REQUESTS.labels(outcome)
+                      for outcome in ('success', 'error', 'timeout', 'skipped')}
+
+
+class _Stage:
+    """记录代码块耗时的上下文管理器（异常时同样记录）"""
+
+    __slots__ = ('name', 'child', 'started')
+
+    def __init__(self, name):
+        self.name = name
+        self.child = _stage_children[name]
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.started
+        self.child.observe(seconds)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add_stage(self.name, seconds)
+
+
+def stage(name):
+    return _Stage(name)
+
+
+def observe_stage(name, seconds):
+    _stage_children[name].observe(seconds)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add_stage(name, seconds)
+
+
+def count_source(source):
+    _source_children[source].inc()
+    trace = current_trace.get()
+    # 批量/流式转换中只要有一批用到在线数据就记为 online
+    if trace is not None and trace.source != 'online':
+        trace.source = source
+
+
+def count_upstream(outcome):
+    _upstream_children[outcome].inc()
+
+
+def cache_counters(cache):
+    """返回 (命中计数器, 未命中计数器)"""
+    return CACHE_REQUESTS.labels(cache, 'hit'), CACHE_REQUESTS.labels(cache, 'miss')
+
+
+def render():
+    """返回 (响应体, Content-Type)；多进程模式下合并所有 worker 的指标"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """worker 退出后清理其多进程指标文件（由 gunicorn child_exit 调用）"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
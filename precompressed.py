@@ -0,0 +1,69 @@
+"""
+预压缩的静态响应
+
+内容在启动时生成一次并保存 gzip / brotli 压缩版本，请求时按 Accept-Encoding
+选择，附带强 ETag，条件请求返回 304。
+brotli 为可选依赖，未安装时只提供 gzip。
+"""
+
+import gzip
+import hashlib
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class PrecompressedAsset:
+    """一份内容及其压缩版本
+
+    brotli_quality 默认 11（最高压缩率，适合启动时只压缩一次的内容）；
+    请求时才生成的内容应使用较低的级别，11 级压缩几 KB 的内容就需要数毫秒。
+    """
+
+    __slots__ = ('mimetype', 'etag', 'variants')
+
+    def __init__(self, body, mimetype, brotli_quality=11):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+        # 编码 -> 内容；压缩后反而更大时不提供该编码
+        self.variants = {None: body}
+        compressed = {'gzip': gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            compressed['br'] = brotli.compress(body, quality=brotli_quality)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[encoding] = data
+
+    def choose_encoding(self, accept_encodings):
+        """按客户端支持情况（werkzeug 解析后的 Accept-Encoding）选择编码，优先 br"""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encodings[encoding]:
+                return encoding
+        return None
+
+    def negotiate(self, accept_encodings, if_none_match):
+        """返回 (编码, ETag, If-None-Match 是否命中)，与 Web 框架无关"""
+        encoding = self.choose_encoding(accept_encodings)
+        # 不同编码是不同的表示，强 ETag 需要区分
+        etag = f"{self.etag}-{encoding}" if encoding else self.etag
+        return encoding, etag, if_none_match.contains(etag)
+
+    def response(self, request, cache_control):
+        """生成 Flask 响应；If-None-Match 命中时返回 304"""
+        encoding, etag, not_modified = self.negotiate(request.accept_encodings, request.if_none_match)
+        if not_modified:
+            response = Response(status=304)
+        else:
+            response = Response(self.variants[encoding], mimetype=self.mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        response.vary.add('Accept-Encoding')
+        return response
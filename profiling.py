@@ -0,0 +1,156 @@
+"""
+按需的请求性能分析与慢请求捕获
+
+两种方式，均默认关闭（app.py 只在配置了任一项时才注册钩子，关闭时没有额外开销）：
+- 指定请求用 cProfile 完整分析，保存为 .pstats（python -m pstats 或 snakeviz 查看）：
+  请求头 X-Profile 的值等于 PROFILE_TOKEN 时，或按 PROFILE_SAMPLE_RATE 的比例随机抽样
+- 慢请求捕获：设置 PROFILE_SLOW_MS 后，后台线程每 PROFILE_INTERVAL_MS 毫秒采样一次
+  正在处理的请求线程的调用栈；请求耗时超过阈值时把采样结果保存为 collapsed stack
+  （每行"调用栈 次数"，可用 flamegraph.pl 或 speedscope 生成火焰图），否则丢弃
+
+文件写入 PROFILE_DIR（默认 logs/profiles），最多保留 PROFILE_MAX_FILES 个，超出时删除最旧的。
+"""
+
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+PROFILE_DIR = os.environ.get(
+    'PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'profiles'))
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', '0'))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', '200'))
+
+PROFILE_HEADER = 'X-Profile'
+
+
+def enabled():
+    return bool(PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0 or PROFILE_SLOW_MS > 0)
+
+
+class ProfileStore:
+    """把分析结果写入目录，文件数超过上限时删除最旧的"""
+
+    def __init__(self, directory=PROFILE_DIR, max_files=PROFILE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+
+    def path(self, label, suffix):
+        """生成文件路径：时间-进程-标签"""
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}-{label}{suffix}"
+        return os.path.join(self.directory, name)
+
+    def save_pstats(self, profile, path):
+        profile.dump_stats(path)
+        self._prune()
+
+    def save_collapsed(self, stacks, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self._prune()
+
+    def _prune(self):
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return
+        # 文件名以时间开头，按名称排序即按时间排序
+        for name in names[:max(0, len(names) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def should_profile(header_value, token=PROFILE_TOKEN, sample_rate=PROFILE_SAMPLE_RATE):
+    """请求是否需要完整分析：请求头匹配令牌，或被随机抽中"""
+    if token and header_value == token:
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def start_profile():
+    profile = cProfile.Profile()
+    profile.enable()
+    return profile
+
+
+_labels = {}
+
+
+def _frame_label(code):
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+def collapse_stack(frame):
+    """调用栈折叠为一行：从最外层到最内层，以分号分隔"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SlowRequestSampler:
+    """对正在处理的请求线程做低频栈采样，只保留超过阈值的请求的结果
+
+    begin()/end() 由请求所在线程调用；采样线程在第一次 begin() 时启动（fork 后的
+    worker 各自启动自己的线程）。
+    """
+
+    def __init__(self, threshold_ms=PROFILE_SLOW_MS, interval_ms=PROFILE_INTERVAL_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self._active = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def begin(self):
+        self._ensure_thread()
+        samples = Counter()
+        with self._lock:
+            self._active[threading.get_ident()] = samples
+        return samples
+
+    def end(self, started):
+        """结束当前线程的采样；超过阈值时返回采样结果，否则返回 None"""
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if samples is None or time.perf_counter() - started < self.threshold:
+            return None
+        return samples
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._active = {}
+            threading.Thread(target=self._run, name='slow-request-sampler', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            # 持锁采样：end() 取走的结果不会再被修改
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[collapse_stack(frame)] += 1
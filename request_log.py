@@ -0,0 +1,225 @@
+"""
+异步缓冲的结构化请求日志（JSONL）
+
+请求线程只把记录放进有界队列（不做任何 I/O），后台线程批量序列化并追加写入文件：
+- 队列满时丢弃新记录并计数（不阻塞请求）
+- 文件超过 max_bytes 时轮转为 .1 .. .N；多个 worker 写同一文件时用文件锁协调轮转，
+  其他进程在下一批写入前发现文件已被轮转并重新打开
+- 进程退出时（atexit / gunicorn worker_exit）写完队列中剩余的记录
+
+每条记录由 Trace 在一次转换结束时生成：输入、输出摘要、数据来源、分阶段耗时（毫秒）与状态。
+单条转换的记录可直接用 loadtest.py 回放。
+"""
+
+import atexit
+import fcntl
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LOG_PATH = os.environ.get(
+    'REQUEST_LOG_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'requests.jsonl'))
+REQUEST_LOG_QUEUE = int(os.environ.get('REQUEST_LOG_QUEUE', '10000'))
+REQUEST_LOG_MAX_BYTES = int(os.environ.get('REQUEST_LOG_MAX_BYTES', str(50 * 1024 * 1024)))
+REQUEST_LOG_BACKUPS = int(os.environ.get('REQUEST_LOG_BACKUPS', '5'))
+
+_STOP = object()
+
+
+class RequestLog:
+    """有界队列 + 后台批量写入的 JSONL 日志"""
+
+    def __init__(self, path=REQUEST_LOG_PATH, max_queue=REQUEST_LOG_QUEUE, batch_size=500,
+                 flush_interval=1.0, max_bytes=REQUEST_LOG_MAX_BYTES, backups=REQUEST_LOG_BACKUPS):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(max_queue)
+        self._fd = None
+        self._pid = None
+        self._thread = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def log(self, record):
+        """放入队列，立即返回；队列满时丢弃并返回 False"""
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            metrics.REQUEST_LOG_DROPPED.inc()
+            return False
+
+    def close(self, timeout=5):
+        """写完队列中的记录后停止后台线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None or thread.ident is None or self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+    def stats(self):
+        return {'path': self.path, 'queued': self._queue.qsize(), 'written': self.written,
+                'dropped': self.dropped, 'pid': os.getpid()}
+
+    def _ensure_writer(self):
+        # fork 之后的子进程需要自己的后台线程
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self._queue.maxsize)
+                self._fd = None
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='request-log', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if stopping:
+                # 停止前把队列里剩下的也写掉
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception:
+                    logger.exception("请求日志写入失败，丢弃 %s 条", len(batch))
+                    self.dropped += len(batch)
+                    metrics.REQUEST_LOG_DROPPED.inc(len(batch))
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _write(self, batch):
+        data = ''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+                       for record in batch).encode('utf-8')
+        fd = self._open()
+        os.write(fd, data)
+        self.written += len(batch)
+        if os.fstat(fd).st_size >= self.max_bytes:
+            self._rotate()
+
+    def _open(self):
+        """打开（或在其他进程轮转后重新打开）日志文件"""
+        if self._fd is not None:
+            try:
+                if os.stat(self.path).st_ino == os.fstat(self._fd).st_ino:
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            os.close(self._fd)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _rotate(self):
+        with open(self.path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # 拿到锁后再确认：可能已被其他进程轮转
+            try:
+                if os.stat(self.path).st_size < self.max_bytes:
+                    return
+            except FileNotFoundError:
+                return
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            if self.backups > 0:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+        self._open()
+
+
+class Trace:
+    """一次转换的日志记录
+
+    进入后成为当前上下文的 trace：metrics.stage() 把各阶段耗时累加到 stages，
+    metrics.count_source() 记录数据来源；处理代码填写 input、output 或 error。
+    退出时生成记录放入 log 的队列（log 为 None 时不记录）。
+    """
+
+    __slots__ = ('log', 'endpoint', 'input', 'output', 'error', 'source', 'stages', 'started', '_token')
+
+    def __init__(self, log, endpoint):
+        self.log = log
+        self.endpoint = endpoint
+        self.input = None
+        self.output = None
+        self.error = None
+        self.source = None
+        self.stages = {}
+
+    def add_stage(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0) + seconds
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._token = metrics.current_trace.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        metrics.current_trace.reset(self._token)
+        if exc is not None and self.error is None:
+            self.error = str(exc)
+        if self.log is not None:
+            self.log.log(self.record())
+
+    def record(self):
+        record = {
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'endpoint': self.endpoint,
+            'status': 'error' if self.error is not None else 'success',
+            'input': self.input,
+            'output': self.output,
+            'source': self.source,
+            'stages_ms': {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            'duration_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'pid': os.getpid()
+        }
+        if self.error is not None:
+            record['error'] = self.error
+        return record
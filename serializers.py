@@ -0,0 +1,67 @@
+"""
+API 响应的序列化
+
+- JSON：安装了 orjson 时由 orjson 生成（比标准库快数倍）。输出与标准库版本等价：
+  键排序、紧凑格式，datetime 仍为 HTTP 日期格式；中文直接以 UTF-8 输出，不再转义为 \\uXXXX
+- MessagePack：请求的 Accept 优先 application/msgpack 时返回（字段与取值与 JSON 相同，
+  体积更小、解析更快，供内部批量调用方使用）；请求体也可以用 MessagePack 发送
+- fields 参数：只返回需要的字段（见 parse_fields）
+
+orjson 与 msgpack 都是可选依赖，未安装时分别回退到标准库 JSON、只提供 JSON。
+"""
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack', 'application/vnd.msgpack')
+
+# datetime 交给 default 处理，保持与标准库版本相同的 HTTP 日期格式
+_ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+                   if orjson is not None else 0)
+
+
+def dumps_json(obj, default):
+    """紧凑、键排序的 JSON 文本（需要 orjson）"""
+    return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS).decode('utf-8')
+
+
+def loads_json(data):
+    return orjson.loads(data)
+
+
+def accepts_msgpack(accept):
+    """Accept（werkzeug MIMEAccept）是否优先 MessagePack；未安装 msgpack 时总是 False"""
+    if msgpack is None:
+        return False
+    return accept.best_match(('application/json',) + MSGPACK_MIMETYPES) in MSGPACK_MIMETYPES
+
+
+def pack(obj, default):
+    return msgpack.packb(obj, default=default)
+
+
+def unpack(data):
+    if msgpack is None:
+        raise ValueError("服务端未安装 msgpack，请使用 JSON")
+    return msgpack.unpackb(data)
+
+
+def parse_fields(value):
+    """解析 fields 参数（逗号分隔的字符串或列表），返回去重后的字段元组，未指定时返回 None
+
+    嵌套字段用点号，如 prev_term.name。
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = tuple(dict.fromkeys(field.strip() for field in value if field and field.strip()))
+    return fields or None
@@ -0,0 +1,385 @@
+"""
+本地天文算法计算二十四节气
+
+太阳视黄经采用 VSOP87 截断级数（Meeus《天文算法》附录 III 的地球 L0~L5 项），
+加 FK5 修正、章动和光行差；每个节气是太阳视黄经到达 15° 整数倍的时刻，
+用牛顿迭代求解。全部计算用 NumPy 向量化，一次调用即可解出任意年份区间的全部节气。
+
+时间均为北京时间（东八区），以“自 1970-01-01 00:00 起的分钟数”表示。
+
+1800~2200 年的结果预先写入二进制索引文件（int32 小端，每年 24 个），
+运行时用 mmap 只读映射，多个 gunicorn worker 共享同一份页缓存。
+生成索引：python solar_terms.py
+"""
+
+import mmap
+import os
+import struct
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+TERM_NAMES = ['立春', '雨水', '惊蛰', '春分', '清明', '谷雨',
+              '立夏', '小满', '芒种', '夏至', '小暑', '大暑',
+              '立秋', '处暑', '白露', '秋分', '寒露', '霜降',
+              '立冬', '小雪', '大雪', '冬至', '小寒', '大寒']
+
+# 索引文件覆盖的年份范围
+INDEX_START_YEAR = 1800
+INDEX_END_YEAR = 2200
+INDEX_PATH = os.environ.get(
+    'SOLAR_TERMS_INDEX',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solar_terms.idx'))
+
+# 文件头：魔数、起始年份、年数
+_INDEX_MAGIC = b'STI1'
+_INDEX_HEADER = struct.Struct('<4sii')
+
+EPOCH = datetime(1970, 1, 1)
+JD_EPOCH = 2440587.5  # 1970-01-01 00:00 的儒略日
+J2000 = 2451545.0
+TROPICAL_YEAR = 365.242189
+BEIJING_OFFSET = 8 / 24
+
+# VSOP87 地球日心黄经级数：每行 (A, B, C)，项值为 A·cos(B + C·τ)
+_L0 = [
+    (175347046, 0, 0), (3341656, 4.6692568, 6283.07585), (34894, 4.6261, 12566.1517),
+    (3497, 2.7441, 5753.3849), (3418, 2.8289, 3.5231), (3136, 3.6277, 77713.7715),
+    (2676, 4.4181, 7860.4194), (2343, 6.1352, 3930.2097), (1324, 0.7425, 11506.7698),
+    (1273, 2.0371, 529.691), (1199, 1.1096, 1577.3435), (990, 5.233, 5884.927),
+    (902, 2.045, 26.298), (857, 3.508, 398.149), (780, 1.179, 5223.694),
+    (753, 2.533, 5507.553), (505, 4.583, 18849.228), (492, 4.205, 775.523),
+    (357, 2.92, 0.067), (317, 5.849, 11790.629), (284, 1.899, 796.298),
+    (271, 0.315, 10977.079), (243, 0.345, 5486.778), (206, 4.806, 2544.314),
+    (205, 1.869, 5573.143), (202, 2.458, 6069.777), (156, 0.833, 213.299),
+    (132, 3.411, 2942.463), (126, 1.083, 20.775), (115, 0.645, 0.98),
+    (103, 0.636, 4694.003), (102, 0.976, 15720.839), (102, 4.267, 7.114),
+    (99, 6.21, 2146.17), (98, 0.68, 155.42), (86, 5.98, 161000.69),
+    (85, 1.3, 6275.96), (85, 3.67, 71430.7), (80, 1.81, 17260.15),
+    (79, 3.04, 12036.46), (75, 1.76, 5088.63), (74, 3.5, 3154.69),
+    (74, 4.68, 801.82), (70, 0.83, 9437.76), (62, 3.98, 8827.39),
+    (61, 1.82, 7084.9), (57, 2.78, 6286.6), (56, 4.39, 14143.5),
+    (56, 3.47, 6279.55), (52, 0.19, 12139.55), (52, 1.33, 1748.02),
+    (51, 0.28, 5856.48), (49, 0.49, 1194.45), (41, 5.37, 8429.24),
+    (41, 2.4, 19651.05), (39, 6.17, 10447.39), (37, 6.04, 10213.29),
+    (37, 2.57, 1059.38), (36, 1.71, 2352.87), (36, 1.78, 6812.77),
+    (33, 0.59, 17789.85), (30, 0.44, 83996.85), (30, 2.74, 1349.87),
+    (25, 3.16, 4690.48),
+]
+_L1 = [
+    (628331966747, 0, 0), (206059, 2.678235, 6283.07585), (4303, 2.6351, 12566.1517),
+    (425, 1.59, 3.523), (119, 5.796, 26.298), (109, 2.966, 1577.344),
+    (93, 2.59, 18849.23), (72, 1.14, 529.69), (68, 1.87, 398.15),
+    (67, 4.41, 5507.55), (59, 2.89, 5223.69), (56, 2.17, 155.42),
+    (45, 0.4, 796.3), (36, 0.47, 775.52), (29, 2.65, 7.11),
+    (21, 5.34, 0.98), (19, 1.85, 5486.78), (19, 4.97, 213.3),
+    (17, 2.99, 6275.96), (16, 0.03, 2544.31), (16, 1.43, 2146.17),
+    (15, 1.21, 10977.08), (12, 2.83, 1748.02), (12, 3.26, 5088.63),
+    (12, 5.27, 1194.45), (12, 2.08, 4694.0), (11, 0.77, 553.57),
+    (10, 1.3, 6286.6), (10, 4.24, 1349.87), (9, 2.7, 242.73),
+    (9, 5.64, 951.72), (8, 5.3, 2352.87), (6, 2.65, 9437.76),
+    (6, 4.67, 4690.48),
+]
+_L2 = [
+    (52919, 0, 0), (8720, 1.0721, 6283.0758), (309, 0.867, 12566.152),
+    (27, 0.05, 3.52), (16, 5.19, 26.3), (16, 3.68, 155.42),
+    (10, 0.76, 18849.23), (9, 2.06, 77713.77), (7, 0.83, 775.52),
+    (5, 4.66, 1577.34), (4, 1.03, 7.11), (4, 3.44, 5573.14),
+    (3, 5.14, 796.3), (3, 6.05, 5507.55), (3, 1.19, 242.73),
+    (3, 6.12, 529.69), (3, 0.31, 398.15), (3, 2.28, 553.57),
+    (2, 4.38, 5223.69), (2, 3.75, 0.98),
+]
+_L3 = [
+    (289, 5.844, 6283.076), (35, 0, 0), (17, 5.49, 12566.15),
+    (3, 5.2, 155.42), (1, 4.72, 3.52), (1, 5.3, 18849.23),
+    (1, 5.97, 242.73),
+]
+_L4 = [(114, 3.142, 0), (8, 4.13, 6283.08), (1, 3.84, 12566.15)]
+_L5 = [(1, 3.14, 0)]
+
+_SERIES = [np.array(s, dtype=np.float64) for s in (_L0, _L1, _L2, _L3, _L4, _L5)]
+
+
+def _series_sum(series, tau):
+    """对一组级数求和，tau 可为任意形状的数组"""
+    a, b, c = series[:, 0], series[:, 1], series[:, 2]
+    return np.sum(a * np.cos(b + c * tau[..., None]), axis=-1)
+
+
+def apparent_solar_longitude(jde):
+    """太阳视黄经（度），jde 为力学时儒略日数组"""
+    jde = np.asarray(jde, dtype=np.float64)
+    tau = (jde - J2000) / 365250.0
+    t = tau * 10  # 儒略世纪数
+
+    helio = sum(_series_sum(s, tau) * tau ** n for n, s in enumerate(_SERIES)) / 1e8
+    lon = np.degrees(helio) + 180.0
+
+    # FK5 修正
+    lon -= 0.09033 / 3600
+    # 章动（主要项）
+    omega = np.radians(125.04452 - 1934.136261 * t)
+    l_sun = np.radians(280.4665 + 36000.7698 * t)
+    l_moon = np.radians(218.3165 + 481267.8813 * t)
+    nutation = (-17.20 * np.sin(omega) - 1.32 * np.sin(2 * l_sun)
+                - 0.23 * np.sin(2 * l_moon) + 0.21 * np.sin(2 * omega))
+    # 光行差（日地距离取近似值）
+    m = np.radians(357.52911 + 35999.05029 * t)
+    r = 1.000140 - 0.016708 * np.cos(m) - 0.000139 * np.cos(2 * m)
+    aberration = -20.4898 / r
+
+    return np.mod(lon + (nutation + aberration) / 3600, 360.0)
+
+
+def delta_t(year):
+    """ΔT = TT - UT（秒），Espenak & Meeus 多项式，year 为小数年份数组"""
+    y = np.asarray(year, dtype=np.float64)
+    u = (y - 1820) / 100
+    t = y - 2000
+    conditions = [
+        y < 1800,
+        y < 1860,
+        y < 1900,
+        y < 1920,
+        y < 1941,
+        y < 1961,
+        y < 1986,
+        y < 2005,
+        y < 2050,
+        y < 2150,
+    ]
+    t1800, t1860, t1900, t1920 = y - 1800, y - 1860, y - 1900, y - 1920
+    t1950, t1975 = y - 1950, y - 1975
+    choices = [
+        -20 + 32 * u ** 2,
+        (13.72 - 0.332447 * t1800 + 0.0068612 * t1800 ** 2 + 0.0041116 * t1800 ** 3
+         - 0.00037436 * t1800 ** 4 + 0.0000121272 * t1800 ** 5
+         - 0.0000001699 * t1800 ** 6 + 0.000000000875 * t1800 ** 7),
+        (7.62 + 0.5737 * t1860 - 0.251754 * t1860 ** 2 + 0.01680668 * t1860 ** 3
+         - 0.0004473624 * t1860 ** 4 + t1860 ** 5 / 233174),
+        (-2.79 + 1.494119 * t1900 - 0.0598939 * t1900 ** 2 + 0.0061966 * t1900 ** 3
+         - 0.000197 * t1900 ** 4),
+        21.20 + 0.84493 * t1920 - 0.076100 * t1920 ** 2 + 0.0020936 * t1920 ** 3,
+        29.07 + 0.407 * t1950 - t1950 ** 2 / 233 + t1950 ** 3 / 2547,
+        45.45 + 1.067 * t1975 - t1975 ** 2 / 260 - t1975 ** 3 / 718,
+        (63.86 + 0.3345 * t - 0.060374 * t ** 2 + 0.0017275 * t ** 3
+         + 0.000651814 * t ** 4 + 0.00002373599 * t ** 5),
+        62.92 + 0.32217 * t + 0.005589 * t ** 2,
+        -20 + 32 * u ** 2 - 0.5628 * (2150 - y),
+    ]
+    return np.select(conditions, choices, default=-20 + 32 * u ** 2)
+
+
+def compute_term_minutes(start_year, end_year):
+    """批量计算 [start_year, end_year] 每年 24 节气的北京时间
+
+    返回形状为 (年数, 24) 的 int64 数组，单位为自 1970-01-01 00:00 起的分钟数；
+    每行从当年立春到次年大寒，顺序与 TERM_NAMES 一致。
+    """
+    years = np.arange(start_year, end_year + 1, dtype=np.float64)[:, None]
+    steps = np.arange(24, dtype=np.float64)[None, :]
+    target = np.mod(315.0 + 15.0 * steps, 360.0)
+
+    # 初值：当年春分的近似时刻，按平均日行速度推算到各节气
+    march_equinox = 2451623.80984 + 365242.37404 * (years - 2000) / 1000
+    jde = march_equinox + (15.0 * steps - 45.0) / 360.0 * TROPICAL_YEAR
+
+    # 牛顿迭代，以太阳平均日行速度作为导数
+    rate = 360.0 / TROPICAL_YEAR
+    for _ in range(10):
+        diff = np.mod(apparent_solar_longitude(jde) - target + 180.0, 360.0) - 180.0
+        jde = jde - diff / rate
+        if np.max(np.abs(diff)) < 1e-7:
+            break
+
+    decimal_year = 2000 + (jde - J2000) / 365.25
+    jd_beijing = jde - delta_t(decimal_year) / 86400 + BEIJING_OFFSET
+    return np.rint((jd_beijing - JD_EPOCH) * 1440).astype(np.int64)
+
+
+def build_index(path=INDEX_PATH, start_year=INDEX_START_YEAR, end_year=INDEX_END_YEAR):
+    """生成节气索引文件（先写临时文件再原子替换，可被多个进程同时调用）"""
+    minutes = compute_term_minutes(start_year, end_year).astype('<i4')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, start_year, end_year - start_year + 1))
+        f.write(minutes.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_index(path=INDEX_PATH):
+    """以只读 mmap 方式加载索引，返回 (起始年份, 形状为 (年数, 24) 的 int32 数组)"""
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, start_year, count = _INDEX_HEADER.unpack_from(mapped)
+    if magic != _INDEX_MAGIC or len(mapped) != _INDEX_HEADER.size + count * 24 * 4:
+        raise ValueError(f"节气索引文件格式错误：{path}")
+    table = np.frombuffer(mapped, dtype='<i4', offset=_INDEX_HEADER.size).reshape(count, 24)
+    return start_year, table
+
+
+class TermTimeline:
+    """连续的节气时间轴：索引范围内所有节气时刻按先后排成一个整数数组
+
+    位置 pos 对应节气 TERM_NAMES[pos % 24]，所在年份行为 start_year + pos // 24；
+    前后节气即 pos - 1 / pos + 1，不受年份边界影响。
+    """
+
+    __slots__ = ('start_year', 'minutes')
+
+    def __init__(self, start_year, minutes):
+        self.start_year = start_year
+        self.minutes = minutes
+
+    @property
+    def end_year(self):
+        return self.start_year + len(self.minutes) // 24 - 1
+
+    def locate(self, minutes):
+        """最后一个不晚于 minutes 的节气位置（二分查找）"""
+        pos = int(np.searchsorted(self.minutes, minutes, side='right')) - 1
+        if not 0 < pos < len(self.minutes) - 1:
+            raise ValueError(f"日期超出支持范围（{self.start_year}-{self.end_year}年）")
+        return pos
+
+    def locate_many(self, minutes):
+        """批量查找，返回位置数组（越界为 -1 或 len - 1，由调用方检查）"""
+        return np.searchsorted(self.minutes, minutes, side='right') - 1
+
+    def term(self, pos):
+        """位置 pos 处的节气"""
+        return Term(pos % 24, self.minutes[pos])
+
+    def with_year(self, year, row):
+        """返回用 row 替换某一年节气的新时间轴（如在线数据），原时间轴不变"""
+        offset = (year - self.start_year) * 24
+        if not 0 <= offset < len(self.minutes):
+            return self
+        minutes = np.array(self.minutes, dtype=np.int64)
+        minutes[offset:offset + 24] = row
+        return TermTimeline(self.start_year, minutes)
+
+
+_index = None
+_timeline = None
+
+
+def _get_index():
+    global _index
+    if _index is None:
+        if not os.path.exists(INDEX_PATH):
+            build_index()
+        _index = load_index()
+    return _index
+
+
+def term_timeline():
+    """基于索引文件的全局节气时间轴（共享 mmap，不复制）"""
+    global _timeline
+    if _timeline is None:
+        start_year, table = _get_index()
+        _timeline = TermTimeline(start_year, table.reshape(-1))
+    return _timeline
+
+
+def term_minutes(year):
+    """某年 24 节气的分钟数数组（索引范围内直接切片，不复制）"""
+    start_year, table = _get_index()
+    if 0 <= year - start_year < len(table):
+        return table[year - start_year]
+    return compute_term_minutes(year, year)[0]
+
+
+def minutes_to_datetime(minutes):
+    """分钟数转为北京时间 datetime（naive）"""
+    return EPOCH + timedelta(minutes=int(minutes))
+
+
+def datetime_to_minutes(dt):
+    """北京时间 datetime 转为分钟数"""
+    return (dt - EPOCH) // timedelta(minutes=1)
+
+
+def minutes_from_terms(terms):
+    """把节气字典列表（如在线数据）转换为分钟数数组"""
+    return np.array([
+        datetime_to_minutes(datetime.strptime(f"{t['date']} {t['time']}", "%Y-%m-%d %H:%M"))
+        for t in terms
+    ], dtype=np.int64)
+
+
+class Term:
+    """单个节气：只保存序号和时刻，字符串在序列化时才生成"""
+
+    __slots__ = ('index', 'minutes')
+
+    def __init__(self, index, minutes):
+        self.index = index
+        self.minutes = int(minutes)
+
+    @property
+    def name(self):
+        return TERM_NAMES[self.index]
+
+    @property
+    def datetime(self):
+        return minutes_to_datetime(self.minutes)
+
+    def to_dict(self):
+        """节气表中使用的字典表示"""
+        dt = self.datetime
+        return {
+            'name': self.name,
+            'date': dt.strftime("%Y-%m-%d"),
+            'time': dt.strftime("%H:%M"),
+            'month': dt.month,
+            'day': dt.day,
+            'hour': dt.hour,
+            'minute': dt.minute
+        }
+
+    def to_detail(self):
+        """节气区间查询结果中使用的节气详情"""
+        dt = self.datetime
+        return {
+            'name': self.name,
+            'datetime': dt,
+            'date': dt.strftime("%Y-%m-%d"),
+            'time': dt.strftime("%H:%M"),
+            'display': f"{dt.year}年{dt.month}月{dt.day}日 {dt.strftime('%H:%M')}"
+        }
+
+    def __repr__(self):
+        return f"Term({self.name}, {self.datetime:%Y-%m-%d %H:%M})"
+
+
+class TermTable:
+    """某一年的 24 个节气（直接引用索引中的一行，不复制）"""
+
+    __slots__ = ('year', 'minutes')
+
+    def __init__(self, year, minutes):
+        self.year = year
+        self.minutes = minutes
+
+    def __len__(self):
+        return len(self.minutes)
+
+    def __getitem__(self, index):
+        return Term(index, self.minutes[index])
+
+    def __iter__(self):
+        return (Term(i, m) for i, m in enumerate(self.minutes))
+
+    def to_list(self):
+        return [term.to_dict() for term in self]
+
+
+def term_table(year):
+    return TermTable(year, term_minutes(year))
+
+
+if __name__ == '__main__':
+    print(f"已生成节气索引：{build_index(sys.argv[1] if len(sys.argv) > 1 else INDEX_PATH)}")
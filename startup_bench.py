@@ -0,0 +1,199 @@
+"""
+冷启动耗时与 worker 内存的测量
+
+- 导入：在全新的子进程中导入模块（默认 core 与 app），重复多次取中位数，
+  并列出导入后是否已加载 flask / requests
+- gunicorn：分别以预加载（preload_app）开、关启动同一个应用，记录从启动到 /readyz
+  返回 200 的时间；发送若干转换请求后读取 master 与各 worker 的 RSS / PSS / USS
+  （/proc/<pid>/smaps_rollup，仅 Linux）。PSS 把共享页按共享进程数均摊，
+  各进程 PSS 之和即整组进程实际占用的内存；USS 为进程独占的部分
+
+在线数据源关闭（与 benchmarks.py 相同），结果只反映本地计算。
+
+用法：
+python startup_bench.py                    # 导入耗时 + gunicorn 预加载开/关对比
+python startup_bench.py --imports-only
+python startup_bench.py --workers 4 --requests 500 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 导入后检查是否已加载的重量级依赖
+HEAVY_MODULES = ('flask', 'werkzeug', 'jinja2', 'requests', 'urllib3')
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'modules': len(sys.modules),
+                   'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def _env(**overrides):
+    env = dict(os.environ)
+    env.setdefault('TERM_CACHE_BACKEND', 'memory')
+    env['ONLINE_TERMS_URL'] = ''
+    env.setdefault('REQUEST_LOG_PATH', os.devnull)
+    env.update(overrides)
+    return env
+
+
+def measure_import(module, repeat=7):
+    """在新进程中导入 module 的耗时（中位数，秒）、模块数与已加载的重量级依赖"""
+    script = _IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=_env(),
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {'seconds': statistics.median(run['seconds'] for run in runs),
+            'modules': runs[-1]['modules'], 'loaded': runs[-1]['loaded']}
+
+
+def memory(pid):
+    """进程的 RSS / PSS / USS（KB）"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            parts = rest.split()
+            if parts and parts[-1] == 'kB':
+                values[key] = int(parts[0])
+    return {'rss': values.get('Rss', 0), 'pss': values.get('Pss', 0),
+            'uss': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)}
+
+
+def children(pid):
+    """直接子进程（gunicorn worker）的 pid 列表"""
+    pids = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # 第 4 个字段为父进程 pid（进程名可能含空格，从右括号之后开始数）
+        if int(stat.rpartition(')')[2].split()[1]) == pid:
+            pids.append(int(name))
+    return sorted(pids)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _get(url, timeout=2):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def measure_gunicorn(preload, workers=2, requests=200, app='app:app', timeout=120):
+    """启动 gunicorn，返回就绪耗时与各进程内存"""
+    port = _free_port()
+    url = f'http://127.0.0.1:{port}'
+    command = [sys.executable, '-m', 'gunicorn', app, '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--log-level', 'warning']
+    if preload:
+        command.append('--preload')
+    # gunicorn 的日志写入临时文件，启动失败时才输出
+    log = tempfile.TemporaryFile('w+')
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=_env(GUNICORN_PRELOAD='1' if preload else '0'),
+                               stdout=log, stderr=subprocess.STDOUT)
+    try:
+        while True:
+            if process.poll() is not None:
+                log.seek(0)
+                sys.stderr.write(log.read())
+                raise RuntimeError(f"gunicorn 已退出（状态码 {process.returncode}）")
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError("等待就绪超时")
+            try:
+                if _get(f'{url}/readyz') == 200:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.02)
+        ready = time.perf_counter() - started
+
+        # 所有 worker 都启动后再发请求，使每个 worker 都处理过转换
+        while len(children(process.pid)) < workers:
+            time.sleep(0.05)
+        for i in range(requests):
+            _get(f'{url}/api/convert?h=south&dt={1950 + i % 70}-{1 + i % 12:02d}-15T12:00')
+        _get(f'{url}/')
+        _get(f'{url}/api/solar_terms/2008')
+
+        master = memory(process.pid)
+        worker_memory = [memory(pid) for pid in children(process.pid)]
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        log.close()
+    return {'preload': preload, 'ready_seconds': ready, 'master': master, 'workers': worker_memory,
+            'total_pss': master['pss'] + sum(w['pss'] for w in worker_memory)}
+
+
+def _mb(kb):
+    return f"{kb / 1024:.1f} MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="冷启动耗时与 worker 内存")
+    parser.add_argument('--modules', default='core,app', help="测量导入耗时的模块（逗号分隔）")
+    parser.add_argument('--repeat', type=int, default=7, help="每个模块导入的次数")
+    parser.add_argument('--app', default='app:app', help="gunicorn 应用")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=200, help="测量内存前发送的转换请求数")
+    parser.add_argument('--imports-only', action='store_true', help="只测导入耗时")
+    parser.add_argument('--json', help="把结果保存为 JSON")
+    args = parser.parse_args(argv)
+
+    report = {'imports': {}, 'gunicorn': []}
+    print("导入耗时（新进程，中位数）：")
+    for module in filter(None, args.modules.split(',')):
+        result = report['imports'][module] = measure_import(module, args.repeat)
+        loaded = '、'.join(result['loaded']) or '无'
+        print(f"  {module:<10}{result['seconds'] * 1000:>9.1f} ms  模块 {result['modules']:>4}  已加载：{loaded}")
+
+    if not args.imports_only:
+        for preload in (False, True):
+            result = measure_gunicorn(preload, args.workers, args.requests, args.app)
+            report['gunicorn'].append(result)
+            print(f"gunicorn {args.app}，{args.workers} 个 worker，预加载{'开' if preload else '关'}：")
+            print(f"  就绪耗时 {result['ready_seconds']:.2f} s，所有进程 PSS 合计 {_mb(result['total_pss'])}")
+            rows = [('master', result['master'])] + [(f'worker {i}', w) for i, w in enumerate(result['workers'], 1)]
+            for name, values in rows:
+                print(f"  {name:<10}RSS {_mb(values['rss']):>10}  PSS {_mb(values['pss']):>10}  "
+                      f"USS {_mb(values['uss']):>10}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
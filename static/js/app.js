@@ -0,0 +1,254 @@
+let solarTermsData = null;
+let datePicker = null;
+let timePicker = null;
+
+// 页面样式（由品牌决定）：picker = flatpickr 选择器、结果替换表单；native = 原生输入、显示节气表
+const UI = document.body.dataset.ui || 'picker';
+
+// 页面加载时初始化
+window.addEventListener('DOMContentLoaded', function() {
+    if (UI !== 'picker') {
+        return;
+    }
+    const year = document.getElementById('year').value;
+    
+    // 初始化日期选择器（移动端友好的滚轮式）
+    datePicker = flatpickr("#inputDate", {
+        locale: "zh",
+        dateFormat: "Y-m-d",
+        defaultDate: `${year}-01-01`,
+        allowInput: false,
+        disableMobile: false,
+        minDate: `${year}-01-01`,
+        maxDate: `${year}-12-31`,
+        onChange: function(selectedDates, dateStr) {
+            console.log("选择的日期:", dateStr);
+        }
+    });
+    
+    // 初始化时间选择器
+    timePicker = flatpickr("#inputTime", {
+        enableTime: true,
+        noCalendar: true,
+        dateFormat: "H:i",
+        time_24hr: true,
+        defaultDate: "12:00",
+        allowInput: false,
+        disableMobile: false,
+        minuteIncrement: 1
+    });
+});
+
+// 更新年份范围的函数
+function updateYearRange() {
+    const year = document.getElementById('year').value;
+    const minDate = `${year}-01-01`;
+    const maxDate = `${year}-12-31`;
+    
+    // 更新日期选择器的年份范围
+    if (datePicker) {
+        datePicker.set('minDate', minDate);
+        datePicker.set('maxDate', maxDate);
+        datePicker.setDate(`${year}-01-01`);
+    }
+    
+    console.log(`年份已更新为: ${year}`);
+}
+
+async function fetchSolarTerms() {
+    const year = document.getElementById('year').value;
+    document.getElementById('loading').classList.remove('hidden');
+    document.getElementById('successMsg').classList.add('hidden');
+    
+    try {
+        const response = await fetch(`/api/solar_terms/${year}`);
+        const data = await response.json();
+        
+        if (data.success) {
+            solarTermsData = data.terms;
+            document.getElementById('loading').classList.add('hidden');
+            document.getElementById('successMsg').classList.remove('hidden');
+            document.getElementById('convertBtn').disabled = false;
+            // picker 样式只提示加载成功，native 样式显示节气表格
+            if (UI === 'native') {
+                renderTermTable(year, data.terms, data.source);
+            }
+        } else {
+            alert('查询失败：' + data.error);
+            document.getElementById('loading').classList.add('hidden');
+        }
+    } catch (error) {
+        alert('查询失败：' + error.message);
+        document.getElementById('loading').classList.add('hidden');
+    }
+}
+
+function renderTermTable(year, terms, source) {
+    const html = `
+        <div class="bg-white rounded-lg shadow-lg p-6">
+            <h3 class="font-bold text-gray-800 mb-3">${year}年24节气精确时间表</h3>
+            <p class="text-sm text-blue-600 mb-3">数据来源：${source}</p>
+            <div class="overflow-x-auto">
+                <table class="w-full text-sm">
+                    <thead>
+                        <tr class="bg-gray-100">
+                            <th class="px-3 py-2 text-left">序号</th>
+                            <th class="px-3 py-2 text-left">北半球节气</th>
+                            <th class="px-3 py-2 text-left">日期时间</th>
+                            <th class="px-3 py-2 text-left">南半球对应</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        ${terms.map((term, i) => `
+                            <tr class="${i % 2 === 0 ? 'bg-white' : 'bg-gray-50'}">
+                                <td class="px-3 py-2">${i + 1}</td>
+                                <td class="px-3 py-2 font-medium text-blue-700">${term.name}</td>
+                                <td class="px-3 py-2">${term.date} ${term.time}</td>
+                                <td class="px-3 py-2 text-orange-700">${term.south_term}</td>
+                            </tr>
+                        `).join('')}
+                    </tbody>
+                </table>
+            </div>
+        </div>
+    `;
+    document.getElementById('termTable').innerHTML = html;
+}
+
+async function convertDate() {
+    const hemisphere = document.getElementById('hemisphere').value;
+    const inputDate = document.getElementById('inputDate').value;
+    const inputTime = document.getElementById('inputTime').value;
+    
+    if (!inputDate || !inputTime) {
+        alert('请输入完整的日期和时间');
+        return;
+    }
+    
+    // 使用可缓存的 GET 接口（规范 URL），相同查询可由浏览器缓存直接返回
+    const response = await fetch(`/api/convert?h=${hemisphere}&dt=${inputDate}T${inputTime}`);
+    
+    const result = await response.json();
+    
+    if (result.success) {
+        if (UI === 'picker') {
+            // 隐藏输入表单，显示结果页面
+            document.querySelector('.bg-white.rounded-lg.shadow-lg.p-6.mb-6').style.display = 'none';
+        }
+        renderResult(result.data);
+    } else {
+        alert('转换失败：' + result.error);
+    }
+}
+
+function renderResult(data) {
+    const [inputIcon, outputIcon] = UI === 'picker' ? ['🌍', '🌏'] : ['🌏', '🌍'];
+    let html = `
+        <div class="bg-white rounded-lg shadow-lg p-6 mb-6">
+            <h2 class="text-2xl font-bold text-center text-indigo-900 mb-6">转换结果</h2>
+            <div class="grid grid-cols-1 md:grid-cols-2 gap-6 mb-4">
+                <div class="bg-gradient-to-br from-orange-50 to-orange-100 rounded-lg p-5 border-2 border-orange-200">
+                    <div class="text-sm text-orange-700 font-medium mb-3">${inputIcon} ${data.input_hemisphere}</div>
+                    <div class="text-2xl font-bold text-orange-900 mb-3">${data.input_datetime}</div>
+                    <div class="space-y-1 text-sm text-orange-800">
+                        <div>所处节气：<span class="font-bold">${data.current_term}</span></div>
+                        ${data.actual_term !== data.current_term ? `<div>实际节气：<span class="font-bold">${data.actual_term}</span></div>` : ''}
+                    </div>
+                </div>
+                <div class="bg-gradient-to-br from-blue-50 to-blue-100 rounded-lg p-5 border-2 border-blue-200">
+                    <div class="text-sm text-blue-700 font-medium mb-3">${outputIcon} 转换后（用于排盘）</div>
+                    <div class="text-2xl font-bold text-blue-900 mb-3">${data.output_datetime}</div>
+                </div>
+            </div>`;
+    
+    // 北半球节气信息
+    if (data.prev_term && data.current_term_detail && data.next_term) {
+        html += `
+            <div class="bg-purple-50 rounded-lg p-4 border border-purple-200 mb-4">
+                <h3 class="font-medium text-purple-900 mb-3 text-sm">北半球节气信息（原日期对应的节气区间）</h3>
+                <div class="grid grid-cols-3 gap-3 text-sm">
+                    <div class="bg-white p-3 rounded">
+                        <div class="text-gray-600 text-xs mb-1">上一个节气</div>
+                        <div class="font-bold text-purple-800 mb-1">${data.prev_term.name}</div>
+                        <div class="text-gray-500 text-xs">${data.prev_term.display}</div>
+                    </div>
+                    <div class="bg-orange-100 p-3 rounded border-2 border-orange-300">
+                        <div class="text-orange-700 text-xs mb-1">当前所处节气</div>
+                        <div class="font-bold text-orange-900 mb-1">${data.current_term_detail.name}</div>
+                        <div class="text-orange-600 text-xs">${data.current_term_detail.display}</div>
+                    </div>
+                    <div class="bg-white p-3 rounded">
+                        <div class="text-gray-600 text-xs mb-1">下一个节气</div>
+                        <div class="font-bold text-purple-800 mb-1">${data.next_term.name}</div>
+                        <div class="text-gray-500 text-xs">${data.next_term.display}</div>
+                    </div>
+                </div>
+            </div>`;
+    }
+    
+    // 南半球节气信息
+    if (data.output_prev_term && data.output_current_term && data.output_next_term) {
+        const southTermPairs = {
+            '立春': '立秋', '雨水': '处暑', '惊蛰': '白露', '春分': '秋分',
+            '清明': '寒露', '谷雨': '霜降', '立夏': '立冬', '小满': '小雪',
+            '芒种': '大雪', '夏至': '冬至', '小暑': '小寒', '大暑': '大寒',
+            '立秋': '立春', '处暑': '雨水', '白露': '惊蛰', '秋分': '春分',
+            '寒露': '清明', '霜降': '谷雨', '立冬': '立夏', '小雪': '小满',
+            '大雪': '芒种', '冬至': '夏至', '小寒': '小暑', '大寒': '大暑'
+        };
+        
+        html += `
+            <div class="bg-amber-50 rounded-lg p-4 border border-amber-200 mb-4">
+                <h3 class="font-medium text-amber-900 mb-3 text-sm">南半球节气信息（实际对应的南半球节气）</h3>
+                <div class="grid grid-cols-3 gap-3 text-sm">
+                    <div class="bg-white p-3 rounded">
+                        <div class="text-gray-600 text-xs mb-1">上一个节气</div>
+                        <div class="font-bold text-amber-800 mb-1">${southTermPairs[data.prev_term.name] || ''}</div>
+                        <div class="text-gray-500 text-xs">对应北半球<br/>${data.prev_term.name}</div>
+                    </div>
+                    <div class="bg-amber-100 p-3 rounded border-2 border-amber-300">
+                        <div class="text-amber-700 text-xs mb-1">当前实际节气</div>
+                        <div class="font-bold text-amber-900 mb-1">${data.actual_term}</div>
+                        <div class="text-amber-600 text-xs">对应北半球<br/>${data.current_term}</div>
+                    </div>
+                    <div class="bg-white p-3 rounded">
+                        <div class="text-gray-600 text-xs mb-1">下一个节气</div>
+                        <div class="font-bold text-amber-800 mb-1">${southTermPairs[data.next_term.name] || ''}</div>
+                        <div class="text-gray-500 text-xs">对应北半球<br/>${data.next_term.name}</div>
+                    </div>
+                </div>
+            </div>`;
+    }
+    
+    html += `
+            <div class="bg-indigo-50 rounded-lg p-4 mb-4">
+                <p class="text-center text-indigo-900 font-medium text-sm">
+                    ${data.input_hemisphere.includes('南') ? `${data.input_datetime} → ${data.output_datetime}` : `确认使用 ${data.input_datetime}`}
+                </p>
+            </div>
+            <div class="bg-green-50 rounded-lg p-4 border border-green-200 ${UI === 'picker' ? 'mb-4' : ''}">
+                <p class="text-sm text-green-800">
+                    <strong>✓ 八字排盘使用：</strong>
+                    <span class="font-bold text-green-900 text-lg ml-2">${data.output_date} ${data.output_time}</span>
+                </p>
+            </div>
+            ${UI === 'picker' ? `
+            <div class="text-center">
+                <button onclick="resetForm()" class="px-8 py-3 bg-indigo-600 hover:bg-indigo-700 text-white font-bold rounded-lg">
+                    重新查询
+                </button>
+            </div>` : ''}
+        </div>
+    `;
+    document.getElementById('resultArea').innerHTML = html;
+}
+
+function resetForm() {
+    // 显示输入表单
+    document.querySelector('.bg-white.rounded-lg.shadow-lg.p-6.mb-6').style.display = 'block';
+    // 清空结果区域
+    document.getElementById('resultArea').innerHTML = '';
+    // 重置表单状态
+    document.getElementById('convertBtn').disabled = true;
+    document.getElementById('successMsg').classList.add('hidden');
+}
@@ -0,0 +1,10 @@
+// Tailwind CLI v3 配置：只扫描页面模板和前端脚本中实际用到的类名
+const path = require('path');
+
+module.exports = {
+  content: [path.join(__dirname, '../../app.py'), path.join(__dirname, '../js/**/*.js')],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};
@@ -0,0 +1,62 @@
+"""
+多品牌（租户）
+
+同一个进程同时服务多个品牌：按请求的 Host（TENANT_HOSTS）或路径前缀（/hongde/）
+选择品牌名称与页面样式，节气数据、缓存、预热与 worker 由所有品牌共用。
+
+页面样式（ui）：
+- picker：flatpickr 选择日期时间，结果页替换输入表单，可"重新查询"（安德堂）
+- native：浏览器原生日期/时间输入，查询节气后显示节气表，结果显示在表单下方（宏德堂）
+
+TENANT_HOSTS 格式：hongde.example.com=hongde,ande.example.com=ande
+未匹配的 Host 使用 DEFAULT_TENANT（默认 ande）。
+"""
+
+import os
+
+
+class Tenant:
+    """一个品牌的名称与页面样式"""
+
+    __slots__ = ('key', 'name', 'ui')
+
+    def __init__(self, key, name, ui):
+        self.key = key
+        self.name = name
+        self.ui = ui
+
+    def __repr__(self):
+        return f"Tenant({self.key}, {self.name}, {self.ui})"
+
+
+TENANTS = {tenant.key: tenant for tenant in (
+    Tenant('ande', '安德堂', 'picker'),
+    Tenant('hongde', '宏德堂', 'native'),
+)}
+
+DEFAULT_TENANT = os.environ.get('DEFAULT_TENANT', 'ande')
+if DEFAULT_TENANT not in TENANTS:
+    raise ValueError(f"DEFAULT_TENANT 必须为 {'/'.join(TENANTS)} 之一")
+
+
+def parse_hosts(value):
+    """解析 TENANT_HOSTS，返回 {小写主机名: 品牌 key}"""
+    hosts = {}
+    for item in (value or '').split(','):
+        if not item.strip():
+            continue
+        host, _, key = item.partition('=')
+        key = key.strip()
+        if key not in TENANTS:
+            raise ValueError(f"TENANT_HOSTS 中的品牌 {key!r} 不存在")
+        hosts[host.strip().lower()] = key
+    return hosts
+
+
+TENANT_HOSTS = parse_hosts(os.environ.get('TENANT_HOSTS'))
+
+
+def tenant_for_host(host):
+    """按 Host 请求头（可带端口）选择品牌"""
+    host = (host or '').split(':', 1)[0].lower()
+    return TENANTS[TENANT_HOSTS.get(host, DEFAULT_TENANT)]
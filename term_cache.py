@@ -0,0 +1,418 @@
+"""
+按年份缓存节气数据
+
+- 有界缓存，超出容量时淘汰最旧的年份
+- 成功结果与失败结果（None）分别设置 TTL，失败结果也会缓存，避免反复请求上游
+- 单飞（single-flight）：同一年份的并发未命中只会触发一次加载，其余请求等待结果
+- 存储后端可替换：MemoryBackend 为进程内缓存；SqliteBackend 使用 WAL 模式的
+  SQLite 文件，同一主机上的所有 worker（以及挂载同一目录的容器）共享缓存，
+  并通过租约保证同一年份在整台主机上只加载一次
+- ResultCache：进程内的有界 LRU，缓存完整的转换结果
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+TERM_CACHE_BACKEND = os.environ.get('TERM_CACHE_BACKEND', 'sqlite')
+TERM_CACHE_PATH = os.environ.get(
+    'TERM_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'south-api-cache.sqlite3'))
+
+# 等待其他进程加载结果时的轮询间隔（秒）
+_POLL_INTERVAL = 0.05
+
+
+class MemoryBackend:
+    """进程内 LRU 存储"""
+
+    shared = False
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (过期时间, 值)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """返回 (是否命中, 值)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.time():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, entry[1]
+
+    def expires_at(self, key):
+        """条目的过期时间（time.time() 时间戳），不存在时返回 None"""
+        entry = self._data.get(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def size(self):
+        return len(self._data)
+
+    def acquire(self, key, lease):
+        """进程内不需要跨进程租约"""
+        return True
+
+    def release(self, key):
+        pass
+
+
+class SqliteBackend:
+    """SQLite（WAL 模式）存储，值以 JSON 保存，可在多个进程间共享"""
+
+    shared = True
+
+    def __init__(self, path=TERM_CACHE_PATH, namespace='terms', maxsize=512):
+        self.path = path
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS term_cache ("
+                         "key TEXT PRIMARY KEY, value TEXT, expires_at REAL, stored_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS term_cache_leases ("
+                         "key TEXT PRIMARY KEY, expires_at REAL)")
+
+    def _conn(self):
+        # 每个线程一个连接；fork 之后的子进程重新连接
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM term_cache WHERE key = ? AND expires_at > ?",
+            (self._key(key), time.time())).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+
+    def expires_at(self, key):
+        row = self._conn().execute(
+            "SELECT expires_at FROM term_cache WHERE key = ?", (self._key(key),)).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO term_cache VALUES (?, ?, ?, ?)",
+                         (self._key(key), json.dumps(value, ensure_ascii=False), now + ttl, now))
+            conn.execute("DELETE FROM term_cache WHERE key IN ("
+                         "SELECT key FROM term_cache WHERE key LIKE ? "
+                         "ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                         (f"{self.namespace}:%", self.maxsize))
+
+    def delete(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM term_cache WHERE key = ?", (self._key(key),))
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM term_cache WHERE key LIKE ?", (f"{self.namespace}:%",))
+
+    def size(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM term_cache WHERE key LIKE ?", (f"{self.namespace}:%",)).fetchone()[0]
+
+    def acquire(self, key, lease):
+        """尝试获取加载租约，成功返回 True；租约过期（持有者崩溃）后可被重新获取"""
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM term_cache_leases WHERE key = ? AND expires_at <= ?",
+                         (self._key(key), now))
+            cursor = conn.execute("INSERT OR IGNORE INTO term_cache_leases VALUES (?, ?)",
+                                  (self._key(key), now + lease))
+            return cursor.rowcount == 1
+
+    def release(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM term_cache_leases WHERE key = ?", (self._key(key),))
+
+
+def create_backend(namespace='terms', maxsize=512):
+    """按 TERM_CACHE_BACKEND 环境变量创建存储后端（sqlite 或 memory）"""
+    if TERM_CACHE_BACKEND == 'memory':
+        return MemoryBackend(maxsize)
+    return SqliteBackend(TERM_CACHE_PATH, namespace, maxsize)
+
+
+class _Call:
+    """进行中的一次加载"""
+
+    __slots__ = ('event', 'value')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+
+
+class TermCache:
+    """线程安全的按年份 TTL 缓存"""
+
+    def __init__(self, maxsize=512, ttl=24 * 3600, negative_ttl=300, backend=None, lease=10,
+                 name='online_terms'):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lease = lease
+        self.backend = backend or MemoryBackend(maxsize)
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._hit_counter, self._miss_counter = metrics.cache_counters(name)
+        # 本进程加载到新数据或清除缓存时递增，依赖这些数据的结果缓存以它为键的一部分
+        self.version = 0
+
+    def get(self, key):
+        """只读取缓存，不加载；未命中返回 None"""
+        found, value = self.backend.get(key)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        (self._hit_counter if found else self._miss_counter).inc()
+        return value
+
+    def get_or_load(self, key, loader, timeout=None):
+        """返回缓存值；未命中或已过期时调用 loader(key) 加载并缓存
+
+        loader 抛出的异常不缓存，直接抛给发起加载的调用方，等待中的调用方得到 None；
+        timeout 为等待其他调用方加载结果的最长秒数，超时返回 None。
+        """
+        found, value = self.backend.get(key)
+        with self._lock:
+            if found:
+                self.hits += 1
+                self._hit_counter.inc()
+                return value
+            self.misses += 1
+            self._miss_counter.inc()
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.event.wait(timeout):
+                return None
+            return call.value
+
+        try:
+            call.value = self._load(key, loader, timeout)
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.value
+
+    def _load(self, key, loader, timeout):
+        # 其他进程持有租约时等待其结果，租约过期仍无结果则自行加载
+        started = time.monotonic()
+        while not self.backend.acquire(key, self.lease):
+            if timeout is not None and time.monotonic() - started >= timeout:
+                return None
+            time.sleep(_POLL_INTERVAL)
+            found, value = self.backend.get(key)
+            if found:
+                return value
+
+        try:
+            # 取得租约前可能已有其他调用方写入结果
+            found, value = self.backend.get(key)
+            if found:
+                return value
+            value = loader(key)
+            self._store(key, value)
+            return value
+        finally:
+            self.backend.release(key)
+
+    async def aget_or_load(self, key, loader, timeout=None):
+        """get_or_load 的异步版本，loader(key) 返回可等待对象
+
+        等待其他调用方或其他进程的加载结果时不阻塞事件循环，共享存储（SQLite）的读写
+        也在线程中执行；语义与 get_or_load 相同。
+        """
+        found, value = await self._abackend(self.backend.get, key)
+        with self._lock:
+            if found:
+                self.hits += 1
+                self._hit_counter.inc()
+                return value
+            self.misses += 1
+            self._miss_counter.inc()
+            future = self._async_calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._async_calls[key] = asyncio.get_running_loop().create_future()
+
+        if not leader:
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+        value = None
+        try:
+            value = await self._aload(key, loader, timeout)
+        finally:
+            with self._lock:
+                del self._async_calls[key]
+            future.set_result(value)
+        return value
+
+    async def _aload(self, key, loader, timeout):
+        started = time.monotonic()
+        while not await self._abackend(self.backend.acquire, key, self.lease):
+            if timeout is not None and time.monotonic() - started >= timeout:
+                return None
+            await asyncio.sleep(_POLL_INTERVAL)
+            found, value = await self._abackend(self.backend.get, key)
+            if found:
+                return value
+
+        try:
+            found, value = await self._abackend(self.backend.get, key)
+            if found:
+                return value
+            value = await loader(key)
+            await self._abackend(self._store, key, value)
+            return value
+        finally:
+            await self._abackend(self.backend.release, key)
+
+    async def _abackend(self, method, *args):
+        """共享存储的操作放到线程中执行（可能等待其他进程的写锁），进程内存储直接调用"""
+        if self.backend.shared:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    def refresh(self, key, loader, margin):
+        """条目不存在或将在 margin 秒内过期时重新加载，返回是否加载
+
+        失败结果（None）同样在到期前重新加载，其 TTL（negative_ttl）即两次重试上游的间隔；
+        只有取得租约的进程加载，其他进程正在加载或刚刚刷新过同一条目时直接跳过。
+        """
+        if not self._expiring(key, margin):
+            return False
+        if not self.backend.acquire(key, self.lease):
+            return False
+        try:
+            # 取得租约前其他进程可能已经刷新
+            if not self._expiring(key, margin):
+                return False
+            self._store(key, loader(key))
+        finally:
+            self.backend.release(key)
+        return True
+
+    def _expiring(self, key, margin):
+        expires_at = self.backend.expires_at(key)
+        return expires_at is None or expires_at - time.time() <= margin
+
+    def _store(self, key, value):
+        self.backend.set(key, value, self.ttl if value is not None else self.negative_ttl)
+        # 失败结果（None）表示使用本地数据，不改变依赖它的结果
+        if value is not None:
+            self.version += 1
+
+    def invalidate(self, key=None):
+        """删除指定年份，未指定时清空全部"""
+        if key is None:
+            self.backend.clear()
+        else:
+            self.backend.delete(key)
+        self.version += 1
+
+    def stats(self):
+        """本进程的命中统计"""
+        with self._lock:
+            return {
+                'backend': type(self.backend).__name__,
+                'shared': self.backend.shared,
+                'size': self.backend.size(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'version': self.version,
+                'pid': os.getpid()
+            }
+
+
+class ResultCache:
+    """进程内有界 LRU 结果缓存（带 TTL），统计命中率
+
+    键由调用方规范化；ttl 限制其他 worker 刷新数据后本进程最多使用旧结果的时间。
+    """
+
+    def __init__(self, maxsize=4096, ttl=300, name='results'):
+        self.ttl = ttl
+        self.backend = MemoryBackend(maxsize)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._hit_counter, self._miss_counter = metrics.cache_counters(name)
+
+    def get(self, key):
+        """返回缓存的结果，未命中返回 None"""
+        found, value = self.backend.get(key)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        (self._hit_counter if found else self._miss_counter).inc()
+        return value
+
+    def set(self, key, value):
+        if self.backend.maxsize > 0:
+            self.backend.set(key, value, self.ttl)
+
+    def invalidate(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'maxsize': self.backend.maxsize,
+                'size': self.backend.size(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'pid': os.getpid()
+            }
@@ -0,0 +1,13 @@
+"""
+测试环境：只用本地计算的节气数据，缓存放在内存中，不写请求日志
+"""
+
+import os
+import sys
+
+# 必须在导入应用模块之前设置，这些变量在模块导入时读取
+os.environ['ONLINE_TERMS_URL'] = ''
+os.environ['TERM_CACHE_BACKEND'] = 'memory'
+os.environ['REQUEST_LOG_PATH'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
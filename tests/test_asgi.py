@@ -0,0 +1,75 @@
+"""
+ASGI 模式：单条转换与节气表在预取之后不在事件循环中读取节气缓存
+（SQLite 存储的读写会等待写锁，阻塞整个事件循环）
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('httpx')
+
+from starlette.testclient import TestClient
+
+import app as wsgi
+import asgi
+import core
+from term_cache import MemoryBackend, TermCache
+
+
+class RecordingBackend(MemoryBackend):
+    """按共享存储处理的内存后端，记录每次读写是否发生在事件循环线程中"""
+
+    shared = True
+
+    def __init__(self):
+        super().__init__()
+        self.on_loop = []
+
+    def _record(self, name):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.on_loop.append(name)
+
+    def get(self, key):
+        self._record('get')
+        return super().get(key)
+
+    def acquire(self, key, lease):
+        self._record('acquire')
+        return super().acquire(key, lease)
+
+    def set(self, key, value, ttl):
+        self._record('set')
+        return super().set(key, value, ttl)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = RecordingBackend()
+    cache = TermCache(backend=backend)
+    # 在线数据已缓存（失败结果，使用本地数据），请求不会访问上游
+    for year in (2007, 2008):
+        backend.set(year, None, 300)
+    monkeypatch.setattr(core, 'ONLINE_TERMS_URL', 'http://127.0.0.1:9/{year}')
+    monkeypatch.setattr(core, 'online_terms_cache', cache)
+    monkeypatch.setattr(wsgi, 'online_terms_cache', cache)
+    core.result_cache.invalidate()
+    return backend
+
+
+@pytest.mark.parametrize('method, url, body', [
+    ('GET', '/api/convert?h=south&dt=2008-03-05T12:00', None),
+    ('POST', '/api/convert', {'hemisphere': 'south', 'date': '2008-03-05', 'time': '12:00'}),
+    ('GET', '/api/solar_terms/2008', None),
+])
+def test_cache_not_read_on_event_loop(backend, method, url, body):
+    with TestClient(asgi.app) as client:
+        response = client.request(method, url, json=body)
+        flask_response = wsgi.app.test_client().open(url, method=method, json=body)
+    assert response.status_code == 200
+    assert response.content == flask_response.data
+    assert backend.on_loop == []
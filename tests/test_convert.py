@@ -0,0 +1,48 @@
+"""
+批量转换与单条转换的一致性：/api/convert_batch 的每一项与逐条 POST /api/convert 的结果相同
+"""
+
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+
+RECORDS = 3000
+
+
+def random_records(count, seed=20240305):
+    rng = random.Random(seed)
+    start = datetime(1901, 1, 1)
+    span = int((datetime(2199, 12, 31, 23, 59) - start).total_seconds() // 60)
+    records = []
+    for _ in range(count):
+        dt = start + timedelta(minutes=rng.randrange(span))
+        records.append({'hemisphere': rng.choice(('north', 'south')),
+                        'date': f"{dt:%Y-%m-%d}", 'time': f"{dt:%H:%M}"})
+    return records
+
+
+@pytest.fixture
+def client():
+    app_module.app.config['TESTING'] = True
+    return app_module.app.test_client()
+
+
+def test_batch_matches_single(client):
+    records = random_records(RECORDS)
+    # 范围边界与格式错误的记录也应逐条一致
+    records += [{'hemisphere': 'south', 'date': '1900-01-01', 'time': '00:00'},
+                {'hemisphere': 'north', 'date': '2024-02-30', 'time': '12:00'},
+                {'hemisphere': 'south', 'date': '2024-03-05', 'time': '25:00'}]
+
+    response = client.post('/api/convert_batch', json={'records': records})
+    batch = json.loads(response.data)
+    assert batch['success'] is True
+    assert len(batch['results']) == len(records)
+
+    for record, result in zip(records, batch['results']):
+        single = json.loads(client.post('/api/convert', json=record).data)
+        assert result == single, record
@@ -0,0 +1,64 @@
+"""
+GET /api/convert 的规范 URL：规范形式直接返回 200；其他写法只跳转一次（301）到规范形式，
+不会形成跳转链或循环。Flask 与 ASGI 两个版本行为相同
+"""
+
+from urllib.parse import urlsplit
+
+import pytest
+
+import app as wsgi
+
+CANONICAL = '/api/convert?h=south&dt=2008-03-05T12:00&fields=actual_term,current_term,output_datetime'
+# 需要百分号编码的字段名（非 ASCII）
+CANONICAL_ENCODED = '/api/convert?h=north&dt=2008-03-05T12:00&fields=output_date,%E5%90%8D%E7%A7%B0'
+
+REDIRECTS = [
+    # 参数顺序与字段顺序
+    ('/api/convert?dt=2008-03-05T12:00&h=south&fields=output_datetime,current_term,actual_term', CANONICAL),
+    # 半球别名、秒、空格分隔、编码后的逗号
+    ('/api/convert?h=S&dt=2008-03-05%2012:00:30&fields=current_term%2Cactual_term,output_datetime', CANONICAL),
+    # date/time 写法、重复与带空格的字段
+    ('/api/convert?hemisphere=south&date=2008-03-05&time=12:00'
+     '&fields=output_datetime,+actual_term,current_term,actual_term', CANONICAL),
+    ('/api/convert?h=n&dt=2008-03-05T12:00&fields=%E5%90%8D%E7%A7%B0,output_date', CANONICAL_ENCODED),
+]
+
+
+def _flask_get(url):
+    response = wsgi.app.test_client().get(url)
+    return response.status_code, response.headers.get('Location')
+
+
+def _asgi_get(url):
+    pytest.importorskip('starlette')
+    pytest.importorskip('httpx')
+    from starlette.testclient import TestClient
+
+    import asgi
+    with TestClient(asgi.app) as client:
+        response = client.get(url, follow_redirects=False)
+    return response.status_code, response.headers.get('location')
+
+
+def _target(location):
+    parts = urlsplit(location)
+    return f"{parts.path}?{parts.query}"
+
+
+@pytest.fixture(params=['flask', 'asgi'])
+def get(request):
+    return _flask_get if request.param == 'flask' else _asgi_get
+
+
+@pytest.mark.parametrize('url', [CANONICAL, CANONICAL_ENCODED])
+def test_canonical_url_is_served_directly(get, url):
+    assert get(url) == (200, None)
+
+
+@pytest.mark.parametrize('url, canonical', REDIRECTS)
+def test_non_canonical_url_redirects_once(get, url, canonical):
+    status, location = get(url)
+    assert status == 301
+    assert _target(location) == canonical
+    assert get(_target(location)) == (200, None)
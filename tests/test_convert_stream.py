@@ -0,0 +1,62 @@
+"""
+流式转换：无法按 UTF-8 解码的行只输出该行的错误，前后的行照常转换（Flask 与 ASGI 相同）
+"""
+
+import json
+
+import pytest
+
+import app as wsgi
+
+INVALID = b'{"hemisphere": "south", "date": "2008-03-05", "time": "\xff\xfe"}\n'
+
+NDJSON = (b'{"hemisphere": "south", "date": "2008-03-05", "time": "12:00"}\n'
+          + INVALID
+          + b'{"hemisphere": "north", "date": "2024-06-21", "time": "08:30"}\n')
+
+CSV = (b'hemisphere,date,time\n'
+       b'south,2008-03-05,12:00\n'
+       b'north,2008-03-05,\xff\xfe\n'
+       b'north,2024-06-21,08:30\n')
+
+
+def _flask_post(body, content_type):
+    response = wsgi.app.test_client().post('/api/convert_stream', data=body, content_type=content_type)
+    return response.status_code, response.data
+
+
+def _asgi_post(body, content_type):
+    pytest.importorskip('starlette')
+    pytest.importorskip('httpx')
+    from starlette.testclient import TestClient
+
+    import asgi
+    with TestClient(asgi.app) as client:
+        response = client.post('/api/convert_stream', content=body, headers={'Content-Type': content_type})
+    return response.status_code, response.content
+
+
+@pytest.fixture(params=['flask', 'asgi'])
+def post(request):
+    return _flask_post if request.param == 'flask' else _asgi_post
+
+
+@pytest.mark.parametrize('body, content_type, lines', [
+    (NDJSON, 'application/x-ndjson', (1, 2, 3)),
+    (CSV, 'text/csv', (2, 3, 4)),
+])
+def test_undecodable_line_fails_alone(post, body, content_type, lines):
+    status, data = post(body, content_type)
+    assert status == 200
+    results = [json.loads(line) for line in data.splitlines()]
+    assert [result['line'] for result in results] == list(lines)
+    assert [result['success'] for result in results] == [True, False, True]
+    assert 'UTF-8' in results[1]['error']
+    assert results[0]['data']['input_datetime'].startswith('2008-03-05')
+    assert results[2]['data']['input_datetime'].startswith('2024-06-21')
+
+
+def test_flask_and_asgi_streams_match():
+    pytest.importorskip('starlette')
+    for body, content_type in ((NDJSON, 'application/x-ndjson'), (CSV, 'text/csv')):
+        assert _flask_post(body, content_type) == _asgi_post(body, content_type)
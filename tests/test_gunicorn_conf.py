@@ -0,0 +1,71 @@
+"""
+gunicorn.conf.py：预加载时导入期间关闭的垃圾回收在 worker 中已恢复，HUP 重新加载后仍然如此
+"""
+
+import gc
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS = os.path.dirname(os.path.abspath(__file__))
+
+pytest.importorskip('gunicorn')
+
+
+def probe_app(environ, start_response):
+    """由 gunicorn 加载的探针应用：返回 worker 的 pid 与是否启用垃圾回收"""
+    body = json.dumps({'pid': os.getpid(), 'gc': gc.isenabled()}).encode()
+    start_response('200 OK', [('Content-Type', 'application/json')])
+    return [body]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _probe(url, timeout=30, exclude_pid=None):
+    """等待 worker 就绪（exclude_pid 给出时等待新 worker）并返回探针结果"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                result = json.loads(response.read())
+            if result['pid'] != exclude_pid:
+                return result
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise AssertionError('等待 gunicorn worker 超时')
+
+
+@pytest.mark.parametrize('preload', ['1', '0'])
+def test_gc_enabled_in_workers_after_reload(tmp_path, preload):
+    port = _free_port()
+    env = dict(os.environ, GUNICORN_PRELOAD=preload,
+               PROMETHEUS_MULTIPROC_DIR=str(tmp_path / 'metrics'))
+    env.pop('SOUTH_GUNICORN_MASTER', None)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'test_gunicorn_conf:probe_app',
+         '--config', os.path.join(ROOT, 'gunicorn.conf.py'), '--pythonpath', f'{ROOT},{TESTS}',
+         '--bind', f'127.0.0.1:{port}', '--workers', '1', '--log-level', 'warning'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f'http://127.0.0.1:{port}/'
+        before = _probe(url)
+        assert before['gc'] is True
+        process.send_signal(signal.SIGHUP)
+        after = _probe(url, exclude_pid=before['pid'])
+        assert after['gc'] is True
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
@@ -0,0 +1,63 @@
+"""
+单条转换的结果缓存：后台刷新取得不同的在线数据时旧结果失效，刷新结果不变（仍为失败结果）时保留
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import core
+from solar_terms import term_table
+from term_cache import TermCache
+
+
+def shifted_terms(year, minutes):
+    """本地节气数据整体平移 minutes 分钟，模拟与本地计算不同的在线数据"""
+    terms = []
+    for term in term_table(year).to_list():
+        dt = datetime.strptime(f"{term['date']} {term['time']}", "%Y-%m-%d %H:%M") + timedelta(minutes=minutes)
+        terms.append({'name': term['name'], 'date': f"{dt:%Y-%m-%d}", 'time': f"{dt:%H:%M}"})
+    return terms
+
+
+@pytest.fixture
+def online(monkeypatch):
+    """启用在线数据源（不发出请求），两个年份已缓存为即将过期的失败结果"""
+    cache = TermCache(negative_ttl=60)
+    for year in (2007, 2008):
+        cache.get_or_load(year, lambda y: None)
+    monkeypatch.setattr(core, 'ONLINE_TERMS_URL', 'http://127.0.0.1:9/{year}')
+    monkeypatch.setattr(core, 'online_terms_cache', cache)
+    core.result_cache.invalidate()
+    responses = {}
+    requested = []
+
+    def request(year, deadline=None):
+        requested.append(year)
+        return responses.get(year)
+
+    monkeypatch.setattr(core, '_request_online_solar_terms', request)
+    yield responses, requested
+    core.result_cache.invalidate()
+
+
+def test_refresh_with_new_data_invalidates_results(online):
+    responses, requested = online
+    before = core.convert_one('south', '2008-03-05', '12:00')
+    assert core.convert_one('south', '2008-03-05', '12:00') is before
+
+    responses[2008] = shifted_terms(2008, 60)
+    core._refresh_year(2008)
+    assert requested == [2008]
+    after = core.convert_one('south', '2008-03-05', '12:00')
+    assert after is not before
+    assert after['current_term_detail'] != before['current_term_detail']
+    assert core.result_cache.stats()['size'] == 1
+
+
+def test_refresh_without_new_data_keeps_results(online):
+    responses, requested = online
+    before = core.convert_one('south', '2008-03-05', '12:00')
+    core._refresh_year(2008)
+    assert requested == [2008]
+    assert core.convert_one('south', '2008-03-05', '12:00') is before
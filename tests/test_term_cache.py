@@ -0,0 +1,123 @@
+"""
+TermCache 的单次加载（single-flight）：同一进程内的线程合并为一次加载，
+多个进程之间通过 SQLite 租约只让一个进程调用 loader
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+
+from term_cache import SqliteBackend, TermCache
+
+PROCESSES = 4
+THREADS = 5
+
+
+def _slow_loader(calls_path):
+    def loader(key):
+        # 每次调用追加一行，测试结束后按行数统计调用次数
+        with open(calls_path, 'a') as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(0.5)
+        return {'year': key}
+    return loader
+
+
+def _worker(db_path, calls_path, start, results):
+    cache = TermCache(backend=SqliteBackend(db_path), lease=10)
+    loader = _slow_loader(calls_path)
+    values = []
+
+    def call():
+        start.wait()
+        values.append(cache.get_or_load(2008, loader, timeout=30))
+
+    threads = [threading.Thread(target=call) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(values)
+
+
+def test_loader_runs_once_across_processes_and_threads(tmp_path):
+    db_path = str(tmp_path / 'term_cache.sqlite3')
+    calls_path = str(tmp_path / 'calls.txt')
+    SqliteBackend(db_path)  # 先建表，避免各进程同时建表
+
+    context = multiprocessing.get_context('fork')
+    start = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=(db_path, calls_path, start, results))
+                 for _ in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    start.set()
+    values = [value for _ in processes for value in results.get(timeout=60)]
+    for process in processes:
+        process.join(timeout=10)
+        assert process.exitcode == 0
+
+    with open(calls_path) as f:
+        calls = f.read().splitlines()
+    assert len(calls) == 1
+    assert values == [{'year': 2008}] * (PROCESSES * THREADS)
+
+
+def test_loader_error_is_not_cached():
+    cache = TermCache()
+
+    def failing(key):
+        raise RuntimeError('upstream down')
+
+    try:
+        cache.get_or_load(2008, failing)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('loader 的异常应抛给调用方')
+    assert cache.get_or_load(2008, lambda key: 'ok') == 'ok'
+
+
+def test_refresh_reloads_expiring_and_failed_entries():
+    cache = TermCache(ttl=3600, negative_ttl=300)
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        return None if key == 1900 else {'year': key}
+
+    cache.get_or_load(2008, loader)
+    cache.get_or_load(1900, loader)
+    calls.clear()
+
+    # 远未过期的条目不刷新，失败结果在到期前 margin 秒内同样刷新
+    assert cache.refresh(2008, loader, margin=120) is False
+    assert cache.refresh(1900, loader, margin=120) is False
+    assert cache.refresh(1900, loader, margin=300) is True
+    assert cache.refresh(2008, loader, margin=3600) is True
+    # 不存在的条目直接加载，请求不会在请求路径上等待上游
+    assert cache.refresh(2024, loader, margin=120) is True
+    assert calls == [1900, 2008, 2024]
+    assert cache.get(2024) == {'year': 2024}
+
+
+def test_refresh_skips_entry_refreshed_by_lease_holder(tmp_path):
+    db_path = str(tmp_path / 'term_cache.sqlite3')
+    first = TermCache(negative_ttl=300, backend=SqliteBackend(db_path))
+    second = TermCache(negative_ttl=300, backend=SqliteBackend(db_path))
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        return None
+
+    # 其他进程持有租约时跳过
+    assert first.backend.acquire(1900, 10)
+    assert second.refresh(1900, loader, margin=120) is False
+    first.backend.release(1900)
+
+    assert first.refresh(1900, loader, margin=120) is True
+    assert second.refresh(1900, loader, margin=120) is False
+    assert calls == [1900]
@@ -0,0 +1,56 @@
+"""
+熔断器：打开后冷却期内拒绝请求，冷却结束放行一次试探；试探既不成功也不失败就结束时
+（如异步请求被取消），再过一个冷却期仍能放行新的试探
+"""
+
+import types
+
+import pytest
+
+import upstream
+from upstream import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(upstream, 'time', types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_lost_probe_does_not_leave_breaker_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=30)
+    breaker.record_failure()
+    assert breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock[0] += 29.9
+    assert breaker.allow() is False
+    clock[0] += 0.1
+    # 冷却结束：只放行一个试探请求
+    assert breaker.allow() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is False
+
+    # 试探请求丢失（未记录成功或失败）：冷却期内仍拒绝，之后再放行一次
+    clock[0] += 29.9
+    assert breaker.allow() is False
+    clock[0] += 0.1
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() is True
+
+
+def test_failed_probe_reopens_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock[0] += 29.9
+    assert breaker.allow() is False
@@ -0,0 +1,220 @@
+"""
+在线节气数据源的 HTTP 客户端
+
+- 复用连接池的 keep-alive 会话（requests 在第一次请求时才导入，会话按进程创建）
+- 熔断器：连续失败达到阈值后在冷却期内直接跳过在线数据源
+- 请求预算（Deadline）：限制单个请求花在上游调用上的总时间
+- AsyncUpstreamClient：基于 aiohttp 的异步版本，供 ASGI 模式（asgi.py）使用
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_TIMEOUT = float(os.environ.get('UPSTREAM_TIMEOUT', '5'))
+UPSTREAM_BUDGET_MS = int(os.environ.get('UPSTREAM_BUDGET_MS', '1000'))
+BREAKER_FAILURES = int(os.environ.get('UPSTREAM_BREAKER_FAILURES', '5'))
+BREAKER_COOLDOWN = float(os.environ.get('UPSTREAM_BREAKER_COOLDOWN', '30'))
+
+# 剩余预算低于该值（秒）时不再发起请求
+_MIN_REQUEST_TIME = 0.05
+
+
+class UpstreamUnavailable(Exception):
+    """熔断打开或预算耗尽，请求未发出"""
+
+
+class Deadline:
+    """单个请求的上游调用时间预算"""
+
+    def __init__(self, budget_ms=UPSTREAM_BUDGET_MS):
+        self.expires_at = time.monotonic() + budget_ms / 1000
+
+    def remaining(self):
+        """剩余时间（秒）"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def exhausted(self):
+        """剩余预算已不足以发起请求"""
+        return self.remaining() < _MIN_REQUEST_TIME
+
+
+class CircuitBreaker:
+    """连续失败 failure_threshold 次后打开，cooldown 秒后放行一次试探请求
+
+    试探请求可能既不成功也不失败就结束（如异步请求被取消），超过 cooldown 仍无结果时
+    再放行一次试探，熔断器不会一直停在半开状态。
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """是否允许发出请求"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # 冷却结束（或上一次试探超时未返回），只放行一个试探请求
+                self.state = self.HALF_OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("在线节气数据源熔断，%s 秒内跳过", self.cooldown)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    """带连接池和熔断的 GET 客户端
+
+    requests 只有访问在线数据源时才需要，在第一次请求时导入。会话按进程创建：
+    gunicorn 预加载时客户端在 master 中构造，fork 出的 worker 各用自己的连接池。
+    """
+
+    def __init__(self, timeout=UPSTREAM_TIMEOUT, pool_size=10, breaker=None):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def preload(self):
+        """只导入 requests，不创建会话（gunicorn 预加载时在 master 中调用，worker 共享已加载的模块）"""
+        import requests  # noqa: F401
+
+    @property
+    def errors(self):
+        """网络错误与超时（requests.RequestException），调用方捕获这些异常"""
+        import requests
+        return requests.RequestException
+
+    def is_timeout(self, error):
+        import requests
+        return isinstance(error, requests.Timeout)
+
+    @property
+    def session(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size,
+                                          max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+                    self._pid = os.getpid()
+        return self._session
+
+    def get(self, url, deadline=None):
+        """发送 GET 请求
+
+        熔断打开或预算不足时抛出 UpstreamUnavailable；网络错误、超时和 5xx
+        计入熔断失败次数并抛出 requests.RequestException。
+        """
+        timeout = _request_timeout(self.timeout, deadline, self.breaker)
+        try:
+            response = self.session.get(url, timeout=timeout)
+            if response.status_code >= 500:
+                response.raise_for_status()
+        except self.errors:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return response
+
+
+class AsyncResponse:
+    """异步请求读取完毕的响应，提供与 requests.Response 相同的常用属性"""
+
+    __slots__ = ('status_code', 'content')
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncUpstreamClient:
+    """UpstreamClient 的异步版本（aiohttp），等待上游时不占用 worker
+
+    breaker 可与同步客户端共用，使后台刷新线程与请求看到同一个熔断状态。
+    会话绑定事件循环，在第一次请求时创建。
+    """
+
+    def __init__(self, timeout=UPSTREAM_TIMEOUT, pool_size=100, breaker=None):
+        # aiohttp 只有 ASGI 模式需要
+        import aiohttp
+        self._aiohttp = aiohttp
+        # 网络错误与超时，调用方捕获这些异常
+        self.errors = (aiohttp.ClientError, asyncio.TimeoutError)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.session = None
+
+    async def get(self, url, deadline=None):
+        """发送 GET 请求并读取响应体
+
+        熔断打开或预算不足时抛出 UpstreamUnavailable；网络错误、超时和 5xx
+        计入熔断失败次数并抛出 self.errors 中的异常。
+        """
+        timeout = _request_timeout(self.timeout, deadline, self.breaker)
+        if self.session is None:
+            self.session = self._aiohttp.ClientSession(
+                connector=self._aiohttp.TCPConnector(limit=self.pool_size))
+        try:
+            async with self.session.get(url, timeout=self._aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status >= 500:
+                    response.raise_for_status()
+                content = await response.read()
+        except self.errors:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return AsyncResponse(response.status, content)
+
+    async def aclose(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+def _request_timeout(timeout, deadline, breaker):
+    """本次请求可用的超时时间；预算不足或熔断打开时抛出 UpstreamUnavailable"""
+    if deadline is not None:
+        timeout = min(timeout, deadline.remaining())
+        if timeout < _MIN_REQUEST_TIME:
+            raise UpstreamUnavailable("上游请求预算已耗尽")
+    if not breaker.allow():
+        raise UpstreamUnavailable("在线数据源熔断中")
+    return timeout
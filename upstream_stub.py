@@ -0,0 +1,87 @@
+"""
+本地模拟的在线节气数据源，用于压测与故障演练（不需要外网）
+
+可配置延迟、错误率与超时率：
+- 延迟：每个请求等待 latency ± jitter 毫秒后返回
+- 错误：按 error_rate 的概率返回 500
+- 超时：按 timeout_rate 的概率挂起 hang 秒（应大于 UPSTREAM_TIMEOUT）后才返回
+
+用法：
+python upstream_stub.py --port 8090 --latency 200 --error-rate 0.1 --timeout-rate 0.05
+ONLINE_TERMS_URL="http://127.0.0.1:8090/lunar/solar/{year}/1/1" gunicorn app:app
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from solar_terms import term_table
+
+_PATH = re.compile(r'^/lunar/solar/(\d+)/')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """按服务器上的配置模拟上游行为"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        config = self.server.config
+        match = _PATH.match(self.path)
+        roll = random.random()
+
+        if roll < config.timeout_rate:
+            time.sleep(config.hang)
+        else:
+            latency = config.latency + random.uniform(-config.jitter, config.jitter)
+            time.sleep(max(0.0, latency) / 1000)
+
+        if match is None:
+            self._send(404, {'code': 404, 'msg': 'not found'})
+        elif config.timeout_rate <= roll < config.timeout_rate + config.error_rate:
+            self._send(500, {'code': 500, 'msg': 'stub error'})
+        else:
+            terms = [{'name': term['name'], 'date': term['date'], 'time': term['time']}
+                     for term in term_table(int(match.group(1))).to_list()]
+            self._send(200, {'code': 200, 'data': terms})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.config.verbose:
+            super().log_message(format, *args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地模拟的在线节气数据源")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=50, help="响应延迟（毫秒）")
+    parser.add_argument('--jitter', type=float, default=0, help="延迟的随机波动（± 毫秒）")
+    parser.add_argument('--error-rate', type=float, default=0, help="返回 500 的概率")
+    parser.add_argument('--timeout-rate', type=float, default=0, help="挂起不响应的概率")
+    parser.add_argument('--hang', type=float, default=30, help="挂起时长（秒）")
+    parser.add_argument('--verbose', action='store_true', help="打印每个请求")
+    config = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer((config.host, config.port), StubHandler)
+    server.daemon_threads = True
+    server.config = config
+    print(f"模拟上游：http://{config.host}:{config.port}/lunar/solar/{{year}}/1/1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+worker 启动时预热节气数据，并在缓存过期前后台刷新
+
+预热完成前 ready 为未就绪状态，供 /readyz 健康检查使用。
+"""
+
+import logging
+import os
+import threading
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+WARMUP_START_YEAR = int(os.environ.get('WARMUP_START_YEAR', '1900'))
+REFRESH_INTERVAL = float(os.environ.get('REFRESH_INTERVAL', '60'))
+
+
+def default_years():
+    """页面实际可选的年份：WARMUP_START_YEAR 到明年"""
+    return range(WARMUP_START_YEAR, date.today().year + 2)
+
+
+class Warmup:
+    """后台预热与刷新线程
+
+    warm_year(year) 在启动时对每个年份调用一次；之后每隔 interval 秒
+    对每个年份调用 refresh_year(year)，由其决定是否需要重新加载。
+    """
+
+    def __init__(self, warm_year, refresh_year, years=None, interval=REFRESH_INTERVAL):
+        self.warm_year = warm_year
+        self.refresh_year = refresh_year
+        self.years = years if years is not None else default_years()
+        self.interval = interval
+        self.ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动后台线程（重复调用无效）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='term-warmup', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        self._each_year(self.warm_year)
+        self.ready.set()
+        logger.info("节气数据预热完成：%s-%s", self.years[0], self.years[-1])
+
+        while not self._stop.wait(self.interval):
+            self._each_year(self.refresh_year)
+
+    def _each_year(self, func):
+        for year in self.years:
+            if self._stop.is_set():
+                return
+            try:
+                func(year)
+            except Exception:
+                logger.exception("节气数据预热/刷新失败（%s年）", year)